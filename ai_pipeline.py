@@ -0,0 +1,124 @@
+import asyncio
+import os
+import queue
+import threading
+
+import openai
+
+
+class BoundedAIPipeline:
+    """Bounded upstream concurrency and per-call deadlines for the AI endpoints' OpenAI calls.
+
+    Calls run as coroutines on one background event loop using the async
+    client. A semaphore caps how many are in flight upstream and every call
+    carries an explicit deadline (which includes time spent queued for the
+    semaphore); a missed deadline raises TimeoutError so callers can fall
+    back. This is not a non-blocking request path: run() and stream() are
+    blocking bridges, so each AI request still holds its WSGI worker thread
+    until the answer (or the deadline) arrives.
+    """
+
+    def __init__(self, api_key=None, max_concurrency=32):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Lock()
+        self.loop = None
+        self.pid = None
+        self.counters = {'calls': 0, 'timeouts': 0, 'errors': 0, 'in_flight': 0}
+
+    def start(self):
+        """Start the event loop thread (once per process, so it survives forks)"""
+        with self.lock:
+            if self.loop is not None and self.pid == os.getpid():
+                return self.loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self.client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+                self.semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name='ai-pipeline', daemon=True).start()
+            ready.wait()
+            self.loop, self.pid = loop, os.getpid()
+            return loop
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    async def with_deadline(self, coroutine, timeout):
+        """Await coroutine with the deadline, keeping the call counters"""
+        self.count('calls')
+        self.count('in_flight')
+        try:
+            return await asyncio.wait_for(coroutine, timeout)
+        except asyncio.TimeoutError:
+            self.count('timeouts')
+            raise TimeoutError(f'OpenAI call exceeded its {timeout}s deadline')
+        except Exception:
+            self.count('errors')
+            raise
+        finally:
+            self.count('in_flight', -1)
+
+    async def complete(self, timeout, **request):
+        """Run one chat completion under the concurrency limit and deadline; return its text"""
+        async def call():
+            async with self.semaphore:
+                response = await self.client.chat.completions.create(timeout=timeout, **request)
+                return response.choices[0].message.content
+
+        return await self.with_deadline(call(), timeout)
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the pipeline loop and return a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.start())
+
+    def run(self, timeout, **request):
+        """Blocking bridge for sync (WSGI) callers: wait for complete() on the pipeline loop"""
+        return self.submit(self.complete(timeout, **request)).result()
+
+    def stream(self, timeout, **request):
+        """Blocking iterator over streamed completion text, for sync (WSGI) callers.
+
+        The whole stream shares one deadline; closing the iterator early
+        cancels the upstream request.
+        """
+        chunks = queue.Queue()
+        done = object()
+
+        async def call():
+            async with self.semaphore:
+                stream = await self.client.chat.completions.create(stream=True, timeout=timeout, **request)
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        chunks.put(event.choices[0].delta.content)
+
+        async def run():
+            try:
+                await self.with_deadline(call(), timeout)
+                chunks.put(done)
+            except Exception as e:
+                chunks.put(e)
+
+        future = self.submit(run())
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is done:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            future.cancel()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
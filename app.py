@@ -1,26 +1,75 @@
-import flask
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import requests
 import json
 import os
-from datetime import datetime
-import openai
-from geopy.geocoders import Nominatim
-from googletrans import Translator
 import random
 from dotenv import load_dotenv
 
+# openai, geopy, googletrans, pandas (listings_loader) and sklearn (intent_model) are
+# imported by the service factories below, so only the services a process uses pay for them
+from booking_calendar import AvailabilityCalendar, parse_stay
+from catalog import PropertyCatalog
+from catalog_snapshot import open_snapshot
+from database import TravelDatabase
+from gazetteer import DEFAULT_GAZETTEER_PATH, CachedGeocoder, Gazetteer
+from http_cache import FastJSONProvider, gzip_response, not_modified, request_etag, with_etag
+from json_stream import JSONArrayStreamParser
+from keyword_matcher import TravelQueryMatcher
+from llm_cache import ResponseCache, normalize_cache_text
+from metrics import CONTENT_TYPE, MetricsRegistry, RequestMetrics, UpstreamMetrics
+from recommender import recommend, recommend_batch
+from safety_store import DEFAULT_ADVISORY_DIR, SafetyStore
+from service_registry import ServiceRegistry
+from single_flight import SingleFlight
+from translation_service import TranslationService
+from traveler_matching import TravelerIndex
+
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize services
-geolocator = Nominatim(user_agent="ai-travel-platform")
-translator = Translator()
-openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Prometheus metrics for /metrics: per-route latency, upstream calls and in-process stages
+metrics = MetricsRegistry()
+RequestMetrics(metrics).install(app)
+upstream = UpstreamMetrics(metrics)
+stage_seconds = metrics.histogram('app_stage_duration_seconds',
+                                  'Time spent in in-process stages (catalog search, scoring, JSON encoding)', ('stage',))
+
+class TimedJSONProvider(FastJSONProvider):
+    """orjson-backed jsonify (when orjson is installed) that times its encoding"""
+
+    def response(self, *args, **kwargs):
+        with stage_seconds.time(('json_encode',)):
+            return super().response(*args, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+# Services are built on first use, so importing the app (or a worker that only
+# searches) doesn't construct clients and indexes it never touches
+services = ServiceRegistry()
+
+def build_geolocator():
+    from geopy.geocoders import Nominatim
+    return upstream.wrap(Nominatim(user_agent="ai-travel-platform"), 'geocode', ['geocode'])
+
+def build_ai_pipeline():
+    from ai_pipeline import BoundedAIPipeline
+    return BoundedAIPipeline(api_key=os.getenv('OPENAI_API_KEY'),
+                             max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', 32)))
+
+geolocator = services.register('geolocator', build_geolocator)
+# Identical OpenAI requests in flight at the same time share one upstream call
+openai_flight = SingleFlight()
+# OpenAI calls with bounded upstream concurrency and per-call deadlines (callers still block on the result)
+ai_pipeline = services.register('ai_pipeline', build_ai_pipeline)
+INTENT_TIMEOUT = float(os.getenv('AI_INTENT_TIMEOUT', 5))
+DESTINATION_TIMEOUT = float(os.getenv('AI_DESTINATION_TIMEOUT', 20))
+# Largest page /api/search and /api/search/nearby will return
+MAX_PAGE_SIZE = 100
+# Local intent model: queries classified at or above this confidence skip the LLM
+INTENT_MODEL_PATH = os.getenv('INTENT_MODEL_PATH', 'intent_model.pkl')
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', 0.85))
 
 class AITravelAgent:
     def __init__(self):
@@ -34,44 +83,86 @@ class AITravelAgent:
             'nightlife': ['bars', 'clubs', 'entertainment', 'nightlife'],
             'family': ['family-friendly', 'kids activities', 'theme parks']
         }
+        from intent_model import IntentLog, LocalIntentModel, LocalIntentParser
+        self.matcher = TravelQueryMatcher(self.activities_keywords)
+        self.local_intent = LocalIntentParser(
+            self.activities_keywords,
+            IntentLog(os.getenv('INTENT_LOG_DB', 'intent_log.db')),
+            model=LocalIntentModel.load(INTENT_MODEL_PATH) if os.path.exists(INTENT_MODEL_PATH) else None,
+            threshold=INTENT_CONFIDENCE_THRESHOLD
+        )
 
     def parse_travel_intent(self, query):
-        """Parse natural language travel queries using AI"""
+        """Parse natural language travel queries, escalating to the LLM only when the local model is unsure"""
+        intent = self.local_intent.parse(query)
+        if intent is not None:
+            return intent
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a travel intent parser. Extract location, activities, budget, dates, and group size from travel queries. Return JSON format."},
-                    {"role": "user", "content": f"Parse this travel request: {query}"}
-                ],
-                max_tokens=200
-            )
-            return json.loads(response.choices[0].message.content)
+            content, shared = openai_flight.do(('intent', normalize_cache_text(query)), self.request_intent, query)
+            intent = json.loads(content)
+            if not shared:
+                self.local_intent.record(query, intent)
+            return intent
         except:
             # Fallback parsing
             return self.fallback_parse(query)
 
+    def intent_request(self, query):
+        return dict(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a travel intent parser. Extract location, activities, budget, dates, and group size from travel queries. Return JSON format."},
+                {"role": "user", "content": f"Parse this travel request: {query}"}
+            ],
+            max_tokens=200
+        )
+
+    def request_intent(self, query):
+        """Ask the LLM to parse a query and return its raw answer (TimeoutError past the deadline)"""
+        with upstream.time('openai'):
+            return ai_pipeline.run(INTENT_TIMEOUT, **self.intent_request(query))
+
     def fallback_parse(self, query):
-        """Simple keyword-based parsing as fallback"""
-        query_lower = query.lower()
-        activities = []
-
-        for activity, keywords in self.activities_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                activities.append(activity)
-
-        return {
-            'activities': activities,
-            'location': None,
-            'budget': None,
-            'dates': None,
-            'group_size': 1
-        }
+        """Keyword-based parsing as fallback: one automaton pass over the query"""
+        return self.matcher.parse(query)
 
 class AirbnbDataService:
     def __init__(self):
         self.base_url = "http://data.insideairbnb.com/united-states"
-        self.sample_data = self.generate_sample_data()
+        self.availability = None
+        snapshot_path = os.getenv('AIRBNB_CATALOG_SNAPSHOT')
+        listings_path = os.getenv('AIRBNB_LISTINGS_PATH')
+        if snapshot_path:
+            self.load_snapshot(snapshot_path)
+        elif listings_path:
+            self.load_listings(listings_path, city=os.getenv('AIRBNB_LISTINGS_CITY'),
+                               country=os.getenv('AIRBNB_LISTINGS_COUNTRY'))
+        else:
+            self.sample_data = self.generate_sample_data()
+            self.catalog = PropertyCatalog(self.sample_data)
+
+    def load_listings(self, path, city=None, country=None, chunksize=50000):
+        """Replace the catalog with an Inside Airbnb listings.csv(.gz) dump"""
+        from listings_loader import ListingsLoader
+        loader = ListingsLoader(path, city=city, country=country, chunksize=chunksize)
+        self.set_catalog(loader.load())
+        return loader
+
+    def load_snapshot(self, path):
+        """Serve the catalog from a compiled snapshot (see catalog_snapshot.py)"""
+        self.set_catalog(open_snapshot(path))
+
+    def set_catalog(self, catalog):
+        """Swap in a new catalog, keeping booking-availability filtering attached"""
+        self.catalog = catalog
+        self.sample_data = catalog.properties
+        if self.availability is not None:
+            self.availability.attach(catalog)
+
+    def use_availability(self, availability):
+        """Filter searches by the booking calendar's free nights"""
+        self.availability = availability
+        availability.attach(self.catalog)
 
     def generate_sample_data(self):
         """Generate sample Airbnb-like data for demonstration"""
@@ -110,53 +201,160 @@ class AirbnbDataService:
 
     def search_properties(self, filters):
         """Search properties based on filters"""
-        results = self.sample_data.copy()
-
-        if filters.get('city'):
-            results = [p for p in results if filters['city'].lower() in p['city'].lower()]
-
-        if filters.get('min_price'):
-            results = [p for p in results if p['price'] >= filters['min_price']]
-
-        if filters.get('max_price'):
-            results = [p for p in results if p['price'] <= filters['max_price']]
-
-        if filters.get('room_type'):
-            results = [p for p in results if p['room_type'] == filters['room_type']]
-
-        if filters.get('min_rating'):
-            results = [p for p in results if p['rating'] >= filters['min_rating']]
-
-        if filters.get('activities'):
-            results = [p for p in results if any(activity in p['activities'] for activity in filters['activities'])]
-
-        return results[:20]  # Limit results
+        return self.catalog.search(filters, limit=20)  # Limit results
+
+    def search_page(self, filters, sort=None, cursor=None, limit=20):
+        """One page of a sorted search, plus the cursor for the next page"""
+        with stage_seconds.time(('search',)):
+            return self.catalog.search_page(filters, sort=sort, cursor=cursor, limit=limit)
+
+    def catalog_version(self):
+        """Content hash of the current catalog, the base of search and recommendation ETags"""
+        return self.catalog.content_version()
+
+    def facet_counts(self, filters):
+        """Result counts per room type, city, price bucket, amenity and activity"""
+        with stage_seconds.time(('facets',)):
+            return self.catalog.facet_counts(filters)
+
+    def recommend(self, preferences, k=10):
+        """Top-k swipe recommendations for a user's preferences"""
+        with stage_seconds.time(('recommend',)):
+            return recommend(self.catalog, preferences, k=k)
+
+    def recommend_batch(self, preferences_list, k=10):
+        """Top-k recommendations for many users in one scoring pass"""
+        with stage_seconds.time(('recommend',)):
+            return recommend_batch(self.catalog, preferences_list, k=k)
+
+    def search_nearby(self, filters, latitude=None, longitude=None, radius_km=10, bbox=None, limit=20, cursor=None):
+        """Search properties around a point or inside a bounding box; returns (properties, next cursor)"""
+        with stage_seconds.time(('search',)):
+            return self.catalog.search_nearby(filters, latitude=latitude, longitude=longitude,
+                                              radius_km=radius_km, bbox=bbox, limit=limit, cursor=cursor)
 
 class SafetyService:
+    def __init__(self, store):
+        self.store = store
+
     def get_safety_info(self, location):
         """Get safety information for a location"""
-        # In a real implementation, this would integrate with travel advisory APIs
-        safety_levels = ['Low Risk', 'Moderate Risk', 'High Risk', 'Very High Risk']
-        return {
-            'overall_safety': random.choice(safety_levels),
-            'crime_rate': round(random.uniform(1.0, 5.0), 1),
-            'health_advisory': random.choice(['None', 'Vaccination recommended', 'Health precautions advised']),
-            'current_events': [
-                'Political stability maintained',
-                'Tourist areas well-monitored',
-                'Standard travel precautions recommended'
-            ],
-            'emergency_contacts': {
-                'police': '911',
-                'medical': '911',
-                'tourist_helpline': '+1-800-TRAVEL'
-            }
-        }
-
-# Initialize services
-ai_agent = AITravelAgent()
-airbnb_service = AirbnbDataService()
-safety_service = SafetyService()
+        return self.store.get(location)
+
+    def get_many(self, locations):
+        """Safety snapshots for many locations, in input order"""
+        return self.store.get_many(locations)
+
+def build_airbnb_service():
+    service = AirbnbDataService()
+    # Filter searches by the booking calendar's free nights
+    service.use_availability(services.get('availability'))
+    return service
+
+def build_response_cache(namespace, ttl_env, ttl_default, **options):
+    return ResponseCache(db_path=os.getenv('LLM_CACHE_DB', 'llm_cache.db'), namespace=namespace,
+                         ttl_seconds=int(os.getenv(ttl_env, ttl_default)), **options)
+
+def build_geocoder():
+    # Place names resolve from the local gazetteer first; Nominatim is only a cached last resort
+    return CachedGeocoder(
+        Gazetteer.from_csv(os.getenv('GAZETTEER_PATH', DEFAULT_GAZETTEER_PATH)),
+        build_response_cache('geocode', 'GEOCODE_CACHE_TTL', 90 * 24 * 3600),
+        live_geocoder=None if os.getenv('GEOCODER_OFFLINE') else geolocator
+    )
+
+def build_safety_service():
+    # Advisory files are indexed in memory and reloaded in the background when they change
+    return SafetyService(SafetyStore(
+        advisory_dir=os.getenv('SAFETY_ADVISORY_DIR', DEFAULT_ADVISORY_DIR),
+        ttl_seconds=int(os.getenv('SAFETY_TTL', 3600)),
+        gazetteer=services.get('geocoder').gazetteer
+    ))
+
+def build_availability():
+    # Per-property interval index over the booking ledger, kept current from its change feed
+    calendar = AvailabilityCalendar(services.get('travel_db'),
+                                    horizon_days=int(os.getenv('AVAILABILITY_HORIZON_DAYS', 512)))
+    calendar.sync()
+    return calendar
+
+def build_traveler_index():
+    # Saved traveler profiles are indexed once; /api/social/connect keeps the index current
+    index = TravelerIndex()
+    for traveler_profile in services.get('travel_db').iter_traveler_profiles():
+        index.add(traveler_profile)
+    return index
+
+def build_translation_service():
+    from googletrans import Translator
+    return TranslationService(lambda: upstream.wrap(Translator(), 'translate', ['translate']),
+                              services.get('translation_cache'),
+                              max_workers=int(os.getenv('TRANSLATE_MAX_WORKERS', 8)),
+                              rate_per_sec=float(os.getenv('TRANSLATE_RATE_PER_SEC', 5)))
+
+ai_agent = services.register('ai_agent', AITravelAgent)
+airbnb_service = services.register('airbnb_service', build_airbnb_service)
+destination_cache = services.register('destination_cache', lambda: build_response_cache(
+    'destinations', 'DESTINATION_CACHE_TTL', 7 * 24 * 3600))
+translation_cache = services.register('translation_cache', lambda: build_response_cache(
+    'translations', 'TRANSLATION_CACHE_TTL', 30 * 24 * 3600, max_entries=10000))
+geocoder = services.register('geocoder', build_geocoder)
+safety_service = services.register('safety_service', build_safety_service)
+travel_db = services.register('travel_db', lambda: TravelDatabase(os.getenv('TRAVEL_DB_PATH', 'travel_platform.db')))
+availability = services.register('availability', build_availability)
+traveler_index = services.register('traveler_index', build_traveler_index)
+translation_service = services.register('translation_service', build_translation_service)
+
+# Bump when the destination prompt changes so stale cached answers are ignored
+DESTINATION_PROMPT_VERSION = 'v1'
+
+def destination_messages(destination_input):
+    """Chat messages asking the LLM for 3 destinations matching the user's input"""
+    # Create a more specific prompt for destination recommendations
+    prompt = f"""
+    The user wants to travel to "{destination_input}". Please suggest 3 specific destinations that match this request.
+
+    For each destination, provide:
+    - name: The destination name and country
+    - description: A compelling 1-2 sentence description
+    - best_time: Best time to visit (e.g., "April-June, September-October")
+    - avg_temp: Average temperature range (e.g., "15-25°C")
+
+    Focus on destinations that are relevant to "{destination_input}". If they mentioned a country, suggest cities/regions within that country. If they mentioned a region, suggest specific places in that region.
+
+    Return the response as a JSON array of objects with the above fields.
+    """
+    return [
+        {"role": "system", "content": "You are a travel expert providing destination recommendations. Always respond with valid JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+def destination_cache_key(destination_input):
+    return f"{DESTINATION_PROMPT_VERSION}:{normalize_cache_text(destination_input)}"
+
+def destination_request(destination_input):
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=destination_messages(destination_input),
+        temperature=0.7
+    )
+
+def request_destinations(destination_input):
+    """Ask the LLM for destination suggestions and return its raw answer (TimeoutError past the deadline)"""
+    with upstream.time('openai'):
+        return ai_pipeline.run(DESTINATION_TIMEOUT, **destination_request(destination_input)).strip()
+
+def strip_markdown_json(ai_content):
+    """Remove ```json fences the model sometimes wraps around its answer"""
+    if '```json' in ai_content:
+        return ai_content.split('```json')[1].split('```')[0].strip()
+    elif '```' in ai_content:
+        return ai_content.split('```')[1].split('```')[0].strip()
+    return ai_content
+
+def cacheable_destinations(recommendations):
+    """Only a non-empty list of destinations is worth caching; anything else is a bad answer"""
+    return isinstance(recommendations, list) and len(recommendations) > 0
 
 @app.route('/')
 def home():
@@ -165,24 +363,124 @@ def home():
         'version': '1.0.0',
         'endpoints': [
             '/api/search',
+            '/api/search/nearby',
             '/api/ai-agent',
+            '/api/ai-agent/stream',
             '/api/recommendations',
+            '/api/recommendations/batch',
             '/api/safety',
-            '/api/translate'
+            '/api/translate',
+            '/api/translate/batch',
+            '/api/geocode',
+            '/api/cache/stats',
+            '/metrics'
         ]
     })
 
+@app.after_request
+def compress_response(response):
+    return gzip_response(response)
+
+def stay_version(filters):
+    """Validate a stay filter in place and catch the calendar up; returns the booking seq it reflects.
+
+    None when filters have no check_in/check_out; ValueError when only one is
+    given or they are malformed.
+    """
+    if not (filters.get('check_in') or filters.get('check_out')):
+        return None
+    if not (filters.get('check_in') and filters.get('check_out')):
+        raise ValueError('Invalid dates: check_in and check_out are both required')
+    try:
+        filters['check_in'], filters['check_out'] = parse_stay(filters.get('check_in'), filters.get('check_out'))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid dates: {e}')
+    # Bookings made by other workers must be visible before filtering on them
+    availability.sync()
+    return availability.seq
+
+def page_size(data):
+    return max(1, min(int(data.get('limit', 20)), MAX_PAGE_SIZE))
+
 @app.route('/api/search', methods=['POST'])
 def search_properties():
-    """Search for properties based on filters"""
+    """Search for properties based on filters (check_in/check_out keep only listings free for every night).
+
+    sort is one of price_asc, price_desc, rating_desc, rating_asc (default: catalog order);
+    pass the returned next_cursor back as cursor to get the following page.
+    facets: true adds counts per room_type, city, price bucket, amenity and activity over all matches.
+    Responses carry an ETag; send it back as If-None-Match to get a 304 while results are unchanged.
+    """
     try:
         filters = request.json
-        results = airbnb_service.search_properties(filters)
+        try:
+            # Date-filtered results also change whenever a booking does
+            booking_seq = stay_version(filters)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        etag = request_etag(airbnb_service.catalog_version(), filters, booking_seq)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        try:
+            results, next_cursor = airbnb_service.search_page(filters, sort=filters.get('sort'),
+                                                              cursor=filters.get('cursor'), limit=page_size(filters))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        response = {
+            'success': True,
+            'count': len(results),
+            'properties': results,
+            'next_cursor': next_cursor
+        }
+        if filters.get('facets'):
+            response['facets'] = airbnb_service.facet_counts(filters)
+        return with_etag(jsonify(response), etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/search/nearby', methods=['POST'])
+def search_nearby():
+    """Search for properties within a radius of a point or inside a bounding box (check_in/check_out as in /api/search)"""
+    try:
+        data = request.json
+        filters = {k: v for k, v in data.items()
+                   if k not in ('latitude', 'longitude', 'radius_km', 'bbox', 'location', 'limit', 'cursor')}
+        try:
+            stay_version(filters)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        latitude, longitude = data.get('latitude'), data.get('longitude')
+        if not data.get('bbox'):
+            if (latitude is None or longitude is None) and data.get('location'):
+                place = geocoder.geocode(data['location'])
+                if place is None:
+                    return jsonify({'success': False, 'error': f"Unknown location: {data['location']}"}), 404
+                latitude, longitude = place['latitude'], place['longitude']
+            if latitude is None or longitude is None:
+                return jsonify({'success': False, 'error': 'Provide latitude/longitude, location or bbox'}), 400
+
+        try:
+            if data.get('bbox'):
+                bbox = [float(v) for v in data['bbox']]
+                if len(bbox) != 4:
+                    return jsonify({'success': False, 'error': 'bbox must be [south, west, north, east]'}), 400
+                area = dict(bbox=bbox)
+            else:
+                area = dict(latitude=float(latitude), longitude=float(longitude),
+                            radius_km=float(data.get('radius_km', 10)))
+            results, next_cursor = airbnb_service.search_nearby(filters, limit=page_size(data),
+                                                                cursor=data.get('cursor'), **area)
+        except ValueError as e:
+            # Bad coordinates, limit or cursor (e.g. one issued by /api/search for another sort)
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         return jsonify({
             'success': True,
             'count': len(results),
-            'properties': results
+            'properties': results,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -200,44 +498,28 @@ def ai_travel_query():
             # Use OpenAI to generate destination recommendations
             destination_input = preferences.get('destination_input', '')
 
-            # Create a more specific prompt for destination recommendations
-            prompt = f"""
-            The user wants to travel to "{destination_input}". Please suggest 3 specific destinations that match this request.
-
-            For each destination, provide:
-            - name: The destination name and country
-            - description: A compelling 1-2 sentence description
-            - best_time: Best time to visit (e.g., "April-June, September-October")
-            - avg_temp: Average temperature range (e.g., "15-25°C")
-
-            Focus on destinations that are relevant to "{destination_input}". If they mentioned a country, suggest cities/regions within that country. If they mentioned a region, suggest specific places in that region.
-
-            Return the response as a JSON array of objects with the above fields.
-            """
+            # Repeat destinations are served from the cache without an API round-trip
+            cache_key = destination_cache_key(destination_input)
+            cached = destination_cache.get(cache_key)
+            if cacheable_destinations(cached):
+                return jsonify({
+                    'success': True,
+                    'query': query,
+                    'recommendations': cached,
+                    'cached': True
+                })
 
             try:
-                response = openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a travel expert providing destination recommendations. Always respond with valid JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
-
-                # Parse the AI response
-                ai_content = response.choices[0].message.content.strip()
+                ai_content, shared = openai_flight.do(('destinations', cache_key), request_destinations, destination_input)
 
                 # Try to extract JSON from the response
-                import json
                 try:
                     # Remove any markdown formatting
-                    if '```json' in ai_content:
-                        ai_content = ai_content.split('```json')[1].split('```')[0].strip()
-                    elif '```' in ai_content:
-                        ai_content = ai_content.split('```')[1].split('```')[0].strip()
+                    ai_content = strip_markdown_json(ai_content)
 
                     recommendations = json.loads(ai_content)
+                    if not shared and cacheable_destinations(recommendations):
+                        destination_cache.set(cache_key, recommendations)
 
                     return jsonify({
                         'success': True,
@@ -253,6 +535,12 @@ def ai_travel_query():
                         'raw_response': ai_content
                     }), 500
 
+            except TimeoutError as timeout_error:
+                return jsonify({
+                    'success': False,
+                    'error': str(timeout_error)
+                }), 504
+
             except Exception as openai_error:
                 return jsonify({
                     'success': False,
@@ -279,52 +567,184 @@ def ai_travel_query():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/ai-agent/stream', methods=['POST'])
+def stream_destination_recommendations():
+    """Stream destination recommendations as server-sent events, one event per destination"""
+    data = request.json or {}
+    destination_input = data.get('preferences', {}).get('destination_input', '')
+    cache_key = destination_cache_key(destination_input)
+
+    def generate():
+        cached = destination_cache.get(cache_key)
+        if cacheable_destinations(cached):
+            for destination in cached:
+                yield sse_event('destination', destination)
+            yield sse_event('done', {'count': len(cached), 'cached': True})
+            return
+
+        parser = JSONArrayStreamParser()
+        recommendations = []
+        chunks = []
+        try:
+            # Timed over the whole stream, first token to last
+            with upstream.time('openai'):
+                for chunk in ai_pipeline.stream(DESTINATION_TIMEOUT, **destination_request(destination_input)):
+                    chunks.append(chunk)
+                    # Emit each destination as soon as its closing brace arrives
+                    for destination in parser.feed(chunk):
+                        recommendations.append(destination)
+                        yield sse_event('destination', destination)
+
+            if not parser.finished or not recommendations:
+                # The model didn't answer with a well-formed array; parse the whole answer instead
+                ai_content = strip_markdown_json(''.join(chunks).strip())
+                try:
+                    parsed = json.loads(ai_content)
+                except json.JSONDecodeError:
+                    yield sse_event('error', {'error': 'Failed to parse AI response', 'raw_response': ai_content})
+                    return
+                cacheable = cacheable_destinations(parsed)
+                parsed = parsed if isinstance(parsed, list) else [parsed]
+                for destination in parsed[len(recommendations):]:
+                    yield sse_event('destination', destination)
+                recommendations = parsed
+            else:
+                cacheable = True
+
+            if cacheable:
+                destination_cache.set(cache_key, recommendations)
+            yield sse_event('done', {'count': len(recommendations), 'cached': False})
+
+        except TimeoutError as timeout_error:
+            yield sse_event('error', {'error': str(timeout_error)})
+        except Exception as openai_error:
+            yield sse_event('error', {'error': f'OpenAI API error: {str(openai_error)}'})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for the response caches (null for services nothing has used yet)"""
+    def built_stats(name, stats=lambda service: service.stats()):
+        return stats(services.get(name)) if services.built(name) else None
+
+    return jsonify({
+        'success': True,
+        'caches': {
+            'destinations': built_stats('destination_cache'),
+            'translations': built_stats('translation_cache'),
+            'geocode': built_stats('geocoder')
+        },
+        'single_flight': {
+            'openai': openai_flight.stats()
+        },
+        'ai_pipeline': built_stats('ai_pipeline'),
+        'local_intent': built_stats('ai_agent', lambda agent: agent.local_intent.stats()),
+        'safety': built_stats('safety_service', lambda service: service.store.stats()),
+        'services': services.stats()
+    })
+
+@metrics.collector
+def service_counters():
+    """Counters the services already keep, read at scrape time (services nothing has used are skipped)"""
+    caches = {}
+    for cache_name, service_name in (('destinations', 'destination_cache'), ('translations', 'translation_cache'),
+                                     ('geocode', 'geocoder')):
+        if services.built(service_name):
+            cache = services.get(service_name)
+            stats = (cache.cache if service_name == 'geocoder' else cache).stats()
+            for result in ('memory_hits', 'disk_hits', 'misses'):
+                caches[(cache_name, result)] = stats[result]
+    yield 'cache_lookups_total', 'counter', 'Response cache lookups, by cache and result', ('cache', 'result'), caches
+
+    yield ('single_flight_calls_total', 'counter', 'OpenAI calls through single-flight, by outcome', ('outcome',),
+           {(outcome,): count for outcome, count in openai_flight.stats().items()
+            if outcome in ('upstream_calls', 'coalesced', 'errors')})
+    if services.built('geocoder'):
+        yield ('geocoder_lookups_total', 'counter', 'Geocoding lookups, by where they were answered', ('source',),
+               {(source,): count for source, count in geocoder.counters.items()})
+    if services.built('safety_service'):
+        stats = safety_service.store.stats()
+        yield ('safety_lookups_total', 'counter', 'Safety lookups, by how they were resolved', ('result',),
+               {(result,): stats[result] for result in ('hits', 'country_hits', 'placeholders')})
+    if services.built('ai_agent'):
+        stats = ai_agent.local_intent.stats()
+        yield ('intent_parses_total', 'counter', 'Intent parses, answered locally or escalated to the LLM', ('path',),
+               {(path,): stats[path] for path in ('local', 'escalated')})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text metrics for this process: routes, upstream calls, stages and caches"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     """Get swipe-based trip recommendations"""
     try:
         data = request.json
         user_preferences = data.get('preferences', {})
+        etag = request_etag(airbnb_service.catalog_version(), user_preferences)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
 
-        # Generate recommendations based on preferences
-        all_properties = airbnb_service.sample_data
+        # Score every property without touching the shared catalog
+        recommendations = airbnb_service.recommend(user_preferences, k=10)
 
-        # Simple recommendation algorithm
-        recommendations = []
-        for prop in all_properties:
-            score = 0
-
-            # Score based on activities
-            if user_preferences.get('activities'):
-                common_activities = set(prop['activities']) & set(user_preferences['activities'])
-                score += len(common_activities) * 2
-
-            # Score based on price preference
-            if user_preferences.get('budget'):
-                if prop['price'] <= user_preferences['budget']:
-                    score += 1
+        return with_etag(jsonify({
+            'success': True,
+            'recommendations': recommendations
+        }), etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-            # Score based on rating
-            score += prop['rating']
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_batch_recommendations():
+    """Get recommendations for many users at once (digests, cache warming)"""
+    try:
+        data = request.json
+        users = data.get('users', [])
+        k = int(data.get('k', 10))
 
-            prop['recommendation_score'] = score
-            recommendations.append(prop)
+        if not isinstance(users, list):
+            return jsonify({'success': False, 'error': 'users must be a list'}), 400
 
-        # Sort by score and return top recommendations
-        recommendations.sort(key=lambda x: x['recommendation_score'], reverse=True)
+        recommendations = airbnb_service.recommend_batch([user.get('preferences', {}) for user in users], k=k)
 
         return jsonify({
             'success': True,
-            'recommendations': recommendations[:10]
+            'count': len(users),
+            'results': [
+                {'user_id': user.get('user_id'), 'recommendations': user_recommendations}
+                for user, user_recommendations in zip(users, recommendations)
+            ]
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/safety', methods=['POST'])
 def get_safety_info():
-    """Get safety information for a location"""
+    """Get safety information for a location, or for many at once with a locations list"""
     try:
         data = request.json
+
+        if 'locations' in data:
+            locations = data['locations']
+            if not isinstance(locations, list) or not all(isinstance(location, str) for location in locations):
+                return jsonify({'success': False, 'error': 'locations must be a list of strings'}), 400
+            snapshots = safety_service.get_many(locations)
+            return jsonify({
+                'success': True,
+                'count': len(locations),
+                'results': [{'location': location, 'safety_info': snapshot}
+                            for location, snapshot in zip(locations, snapshots)]
+            })
+
         location = data.get('location', '')
 
         safety_info = safety_service.get_safety_info(location)
@@ -345,50 +765,76 @@ def translate_text():
         text = data.get('text', '')
         target_language = data.get('target_language', 'en')
 
-        translated = translator.translate(text, dest=target_language)
+        translated = translation_service.translate(text, target_language)
 
         return jsonify({
             'success': True,
             'original_text': text,
-            'translated_text': translated.text,
-            'source_language': translated.src,
+            'translated_text': translated['translated_text'],
+            'source_language': translated['source_language'],
             'target_language': target_language
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/translate/batch', methods=['POST'])
+def translate_batch():
+    """Translate many text segments to one language in a single request"""
+    try:
+        data = request.json
+        segments = data.get('segments', [])
+        target_language = data.get('target_language', 'en')
+
+        if not isinstance(segments, list) or not all(isinstance(s, str) for s in segments):
+            return jsonify({'success': False, 'error': 'segments must be a list of strings'}), 400
+
+        translations, stats = translation_service.translate_many(segments, target_language)
+
+        return jsonify({
+            'success': True,
+            'target_language': target_language,
+            'translations': translations,
+            'stats': stats
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/geocode', methods=['POST'])
+def geocode_places():
+    """Resolve one place name (query) or many (queries) to coordinates"""
+    try:
+        data = request.json
+        queries = data.get('queries') or [data.get('query', '')]
+
+        results = [dict(geocoder.geocode(q) or {'latitude': None, 'longitude': None}, query=q) for q in queries]
+
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/social/connect', methods=['POST'])
 def connect_travelers():
     """Connect solo travelers with similar interests"""
     try:
         data = request.json
         user_profile = data.get('profile', {})
+        limit = int(data.get('limit', 10))
 
-        # Mock social matching
-        potential_matches = [
-            {
-                'user_id': 'user_123',
-                'name': 'Sarah M.',
-                'age': 28,
-                'interests': ['hiking', 'photography', 'local food'],
-                'travel_style': 'adventure',
-                'safety_verified': True,
-                'mutual_connections': 2
-            },
-            {
-                'user_id': 'user_456',
-                'name': 'Mike T.',
-                'age': 32,
-                'interests': ['culture', 'museums', 'nightlife'],
-                'travel_style': 'cultural',
-                'safety_verified': True,
-                'mutual_connections': 1
-            }
-        ]
+        # Registered travelers become matchable by everyone else; an unchanged profile is neither rewritten nor re-indexed
+        if (user_profile.get('user_id') and data.get('register', True)
+                and not traveler_index.indexed(user_profile)):
+            travel_db.save_traveler_profile(user_profile)
+            traveler_index.add(user_profile)
+
+        matches = traveler_index.match(user_profile, k=limit)
 
         return jsonify({
             'success': True,
-            'matches': potential_matches
+            'count': len(matches),
+            'matches': matches
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -402,17 +848,32 @@ def manage_booking():
         booking_id = data.get('booking_id', '')
 
         if action == 'create':
-            # Create new booking
-            booking = {
-                'booking_id': f'booking_{random.randint(1000, 9999)}',
-                'property_id': data.get('property_id'),
-                'check_in': data.get('check_in'),
-                'check_out': data.get('check_out'),
+            if not data.get('property_id'):
+                return jsonify({'success': False, 'error': 'property_id is required'}), 400
+            try:
+                check_in, check_out = parse_stay(data.get('check_in'), data.get('check_out'))
+            except (TypeError, ValueError) as e:
+                return jsonify({'success': False, 'error': f'Invalid dates: {e}'}), 400
+            property_id = str(data['property_id'])
+            if airbnb_service.catalog.row_of(property_id) is None:
+                return jsonify({'success': False, 'error': f'Unknown property: {property_id}'}), 404
+
+            # Cheap in-memory rejection first; the ledger transaction is the authoritative check
+            availability.sync()
+            if not availability.is_available(property_id, check_in, check_out):
+                return jsonify({'success': False, 'error': 'Property is not available for those dates'}), 409
+
+            booking = travel_db.create_booking({
+                'property_id': property_id,
+                'user_id': data.get('user_id'),
+                'check_in': check_in,
+                'check_out': check_out,
                 'guests': data.get('guests', 1),
-                'total_price': data.get('total_price'),
-                'status': 'confirmed',
-                'created_at': datetime.now().isoformat()
-            }
+                'total_price': data.get('total_price')
+            })
+            if booking is None:
+                return jsonify({'success': False, 'error': 'Property is not available for those dates'}), 409
+            availability.record(booking)
 
             return jsonify({
                 'success': True,
@@ -421,17 +882,45 @@ def manage_booking():
             })
 
         elif action == 'cancel':
+            booking = travel_db.cancel_booking(booking_id)
+            if booking is None:
+                return jsonify({'success': False, 'error': f'No confirmed booking: {booking_id}'}), 404
+            availability.record(booking)
+
             return jsonify({
                 'success': True,
                 'booking_id': booking_id,
+                'booking': booking,
                 'message': 'Booking cancelled successfully',
                 'refund_amount': data.get('refund_amount', 0)
             })
 
         elif action == 'modify':
+            current = travel_db.get_booking(booking_id)
+            if current is None or current['status'] != 'confirmed':
+                return jsonify({'success': False, 'error': f'No confirmed booking: {booking_id}'}), 404
+            changes = {k: v for k, v in data.get('changes', {}).items()
+                       if k in ('check_in', 'check_out', 'guests', 'total_price')}
+            try:
+                changes['check_in'], changes['check_out'] = parse_stay(changes.get('check_in', current['check_in']),
+                                                                       changes.get('check_out', current['check_out']))
+            except (TypeError, ValueError) as e:
+                return jsonify({'success': False, 'error': f'Invalid dates: {e}'}), 400
+
+            availability.sync()
+            if not availability.is_available(current['property_id'], changes['check_in'], changes['check_out'],
+                                             ignore_booking_id=booking_id):
+                return jsonify({'success': False, 'error': 'Property is not available for those dates'}), 409
+
+            booking = travel_db.modify_booking(booking_id, changes)
+            if booking is None:
+                return jsonify({'success': False, 'error': 'Property is not available for those dates'}), 409
+            availability.record(booking)
+
             return jsonify({
                 'success': True,
                 'booking_id': booking_id,
+                'booking': booking,
                 'message': 'Booking modified successfully',
                 'changes': data.get('changes', {})
             })
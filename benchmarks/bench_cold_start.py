@@ -0,0 +1,65 @@
+"""Cold-start cost of app.py: the import itself, then each lazily built service.
+
+Every measurement runs in a fresh interpreter so module imports are paid
+again, the way a new worker or serverless instance pays them. A service's
+cost includes the services and modules it pulls in. Run from the
+repository root:
+
+    python benchmarks/bench_cold_start.py --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+names = list(app.services.factories) if {name!r} == '*' else [{name!r}]
+for name in names:
+    app.services.get(name)
+built = time.perf_counter()
+print(json.dumps({{'names': list(app.services.factories), 'import': imported - start, 'build': built - imported,
+                  'modules': len(sys.modules)}}))
+"""
+
+
+def measure(name, env):
+    output = subprocess.run([sys.executable, '-c', CHILD.format(name=name)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def median_ms(runs, field):
+    return statistics.median(run[field] for run in runs) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark app.py import and per-service cold-start cost')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Databases go to a scratch directory; no network is touched while building services
+        env = dict(os.environ, PYTHONPATH=ROOT,
+                   TRAVEL_DB_PATH=os.path.join(tmp, 'travel.db'),
+                   LLM_CACHE_DB=os.path.join(tmp, 'llm_cache.db'),
+                   INTENT_LOG_DB=os.path.join(tmp, 'intent_log.db'))
+        env.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+
+        everything = [measure('*', env) for _ in range(args.repeat)]
+        names = everything[0]['names']
+        print(f"{'service':>22} {'import ms':>10} {'first use ms':>13} {'modules':>8}")
+        for name in names:
+            runs = [measure(name, env) for _ in range(args.repeat)]
+            print(f"{name:>22} {median_ms(runs, 'import'):>10.0f} {median_ms(runs, 'build'):>13.0f} "
+                  f"{runs[0]['modules']:>8}")
+        print(f"{'all (eager)':>22} {median_ms(everything, 'import'):>10.0f} {median_ms(everything, 'build'):>13.0f} "
+              f"{everything[0]['modules']:>8}")
@@ -0,0 +1,87 @@
+"""Per-query cost of AITravelAgent.fallback_parse: nested keyword scan vs compiled automaton.
+
+Run from the repository root:
+
+    python benchmarks/bench_fallback_parse.py --keywords 10 100 1000 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import TravelQueryMatcher
+
+BASE_KEYWORDS = {
+    'whales': ['whale watching', 'marine life', 'ocean tours', 'coastal'],
+    'mountains': ['hiking', 'skiing', 'mountain views', 'alpine'],
+    'beaches': ['beach', 'swimming', 'surfing', 'coastal'],
+    'culture': ['museums', 'historic sites', 'art galleries', 'cultural'],
+    'food': ['restaurants', 'local cuisine', 'food tours', 'culinary'],
+    'adventure': ['extreme sports', 'adventure tours', 'outdoor activities'],
+    'nightlife': ['bars', 'clubs', 'entertainment', 'nightlife'],
+    'family': ['family-friendly', 'kids activities', 'theme parks']
+}
+
+QUERIES = [
+    'Whale watching in Maui for 2 adults and 3 kids under $300 per night in March',
+    'Looking for a quiet beach town with great local cuisine, budget of 2k, this summer',
+    'Solo hiking and skiing trip in the alps next week, 1500 dollars',
+    'family of four wants theme parks and kids activities around christmas',
+    'honeymoon in bali with surfing, art galleries and nightlife, $2,500',
+    'somewhere warm',
+]
+
+
+def synthetic_vocabulary(keywords_per_activity, seed=0):
+    """Pad every category with random synonym-like phrases up to keywords_per_activity"""
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = {}
+    for activity, keywords in BASE_KEYWORDS.items():
+        padded = list(keywords)
+        while len(padded) < keywords_per_activity:
+            words = [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(rng.randint(1, 2))]
+            padded.append(' '.join(words))
+        vocabulary[activity] = padded
+    return vocabulary
+
+
+def nested_scan(activities_keywords, query):
+    # The previous fallback_parse activity loop
+    query_lower = query.lower()
+    return [activity for activity, keywords in activities_keywords.items()
+            if any(keyword in query_lower for keyword in keywords)]
+
+
+def per_query_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark fallback_parse keyword matching')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[4, 50, 500, 5000],
+                        help='Keywords per activity category')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>10} {'nested scan':>14} {'automaton':>14} {'build':>10}")
+    for size in args.keywords:
+        vocabulary = synthetic_vocabulary(size)
+        start = time.perf_counter()
+        matcher = TravelQueryMatcher(vocabulary)
+        build = time.perf_counter() - start
+
+        for query in QUERIES:
+            assert matcher.parse(query)['activities'] == nested_scan(vocabulary, query)
+
+        nested = per_query_us(lambda q: nested_scan(vocabulary, q), args.repeat)
+        compiled = per_query_us(matcher.parse, args.repeat)
+        total = sum(len(keywords) for keywords in vocabulary.values())
+        print(f'{total:>10,} {nested:>11.1f} us {compiled:>11.1f} us {build * 1000:>7.1f} ms')
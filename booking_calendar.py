@@ -0,0 +1,228 @@
+import bisect
+import threading
+from datetime import date
+
+import numpy as np
+
+
+def parse_stay(check_in, check_out):
+    """Validate a stay and return (check_in, check_out) as ISO dates; check_out is exclusive"""
+    start, end = date.fromisoformat(str(check_in)[:10]), date.fromisoformat(str(check_out)[:10])
+    if end <= start:
+        raise ValueError('check_out must be after check_in')
+    return start.isoformat(), end.isoformat()
+
+
+def day_number(value):
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+class PropertyCalendar:
+    """Confirmed stays of one property as sorted, non-overlapping [start, end) day intervals"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.booking_ids = []
+
+    def conflict(self, start, end, ignore_booking_id=None):
+        """Id of a stay overlapping [start, end), or None (binary search)"""
+        # Stays never overlap, so ends are sorted too: only the last stay starting before end can collide
+        i = bisect.bisect_left(self.starts, end) - 1
+        if i >= 0 and self.booking_ids[i] == ignore_booking_id:
+            i -= 1
+        if i >= 0 and self.ends[i] > start:
+            return self.booking_ids[i]
+        return None
+
+    def insert(self, start, end, booking_id):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+
+    def remove(self, start, booking_id):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.booking_ids[i] != booking_id:
+            i += 1
+        if i < len(self.starts):
+            del self.starts[i], self.ends[i], self.booking_ids[i]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class NightBitsets:
+    """Booked nights of catalog rows as uint64 bit words over a rolling horizon.
+
+    Only rows with bookings get a slot (slot_of_row maps catalog row ->
+    slot, -1 for never booked), so memory follows the booked inventory.
+    Bit i of a slot is night start + i. A date-range check builds the
+    range's word mask once and ANDs it against every candidate row at once.
+    """
+
+    def __init__(self, size, start=None, horizon_days=512):
+        self.start = (start or date.today()).toordinal()
+        self.days = -(-horizon_days // 64) * 64
+        self.slot_of_row = np.full(size, -1, dtype=np.int32)
+        self.words = np.zeros((16, self.days // 64), dtype=np.uint64)
+        self.slots = 0
+
+    def covers(self, first, last):
+        return first >= self.start and last <= self.start + self.days
+
+    def range_words(self, first, last):
+        """Word mask with the bits of nights [first, last) inside the horizon"""
+        bits = np.zeros(self.days, dtype=bool)
+        bits[max(first - self.start, 0):max(min(last - self.start, self.days), 0)] = True
+        return np.packbits(bits, bitorder='little').view('<u8')
+
+    def slot(self, row):
+        slot = self.slot_of_row[row]
+        if slot < 0:
+            if self.slots == len(self.words):
+                self.words = np.concatenate([self.words, np.zeros_like(self.words)])
+            slot = self.slot_of_row[row] = self.slots
+            self.slots += 1
+        return slot
+
+    def mark(self, row, first, last, booked=True):
+        mask = self.range_words(first, last)
+        slot = self.slot(row)
+        if booked:
+            self.words[slot] |= mask
+        else:
+            self.words[slot] &= ~mask
+
+    def booked_mask(self, rows, first, last):
+        """True for rows with any booked night in [first, last) inside the horizon"""
+        slots = self.slot_of_row[rows]
+        booked = slots >= 0
+        candidates = np.flatnonzero(booked)
+        low, high = max(first - self.start, 0), min(last - self.start, self.days)
+        if high <= low:
+            booked[:] = False
+        elif len(candidates):
+            # Only the words the stay spans (usually one) are read
+            words = slice(low // 64, (high - 1) // 64 + 1)
+            mask = self.range_words(first, last)[words]
+            booked[candidates] = (self.words[slots[candidates], words] & mask).any(axis=1)
+        return booked
+
+
+class AvailabilityCalendar:
+    """In-memory availability index over the booking ledger.
+
+    Each property keeps its confirmed stays sorted by check-in, so an
+    availability check is a binary search. The database stays the source
+    of truth (its write transaction makes conflict checks atomic across
+    workers); sync() replays the ledger's change feed so every process's
+    calendar catches up with bookings made elsewhere.
+
+    Once attached to a search catalog it also mirrors the stays into
+    NightBitsets so search can drop unavailable rows in bulk.
+    """
+
+    def __init__(self, db, horizon_days=512):
+        self.db = db
+        self.horizon_days = horizon_days
+        self.properties = {}
+        self.positions = {}
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.catalog = None
+        self.bitsets = None
+
+    def attach(self, catalog):
+        """Serve date filters for catalog's searches"""
+        with self.lock:
+            self.catalog = catalog
+            self.rebuild_bitsets()
+        catalog.availability = self
+
+    def catalog_row(self, property_id):
+        # Looked up in the catalog's id column, so a snapshot catalog never decodes its rows here
+        return self.catalog.row_of(property_id)
+
+    def rebuild_bitsets(self):
+        """Recompute the night bitsets (on attach and when the horizon rolls over)"""
+        bitsets = NightBitsets(len(self.catalog), horizon_days=self.horizon_days)
+        for property_id, calendar in self.properties.items():
+            row = self.catalog_row(property_id)
+            if row is not None:
+                for start, end in zip(calendar.starts, calendar.ends):
+                    bitsets.mark(row, start, end)
+        self.bitsets = bitsets
+
+    def mark(self, property_id, start, end, booked):
+        if self.bitsets is not None:
+            row = self.catalog_row(property_id)
+            if row is not None:
+                self.bitsets.mark(row, start, end, booked)
+
+    def apply(self, booking):
+        """Bring the index in line with one booking row"""
+        booking_id = booking['booking_id']
+        previous = self.positions.pop(booking_id, None)
+        if previous is not None:
+            property_id, start, end = previous
+            self.properties[property_id].remove(start, booking_id)
+            self.mark(property_id, start, end, booked=False)
+        if booking['status'] == 'confirmed':
+            property_id = str(booking['property_id'])
+            start, end = day_number(booking['check_in']), day_number(booking['check_out'])
+            self.properties.setdefault(property_id, PropertyCalendar()).insert(start, end, booking_id)
+            self.positions[booking_id] = (property_id, start, end)
+            self.mark(property_id, start, end, booked=True)
+
+    def record(self, booking):
+        """Apply a booking this process just wrote, without waiting for the next sync"""
+        with self.lock:
+            self.apply(booking)
+
+    def sync(self):
+        """Apply ledger changes made since the last sync; returns how many were applied"""
+        applied = 0
+        with self.lock:
+            while True:
+                seq, bookings = self.db.get_booking_changes(self.seq)
+                if not bookings:
+                    return applied
+                for booking in bookings:
+                    self.apply(booking)
+                self.seq = seq
+                applied += len(bookings)
+
+    def conflict(self, property_id, check_in, check_out, ignore_booking_id=None):
+        calendar = self.properties.get(str(property_id))
+        if calendar is None:
+            return None
+        return calendar.conflict(day_number(check_in), day_number(check_out), ignore_booking_id)
+
+    def is_available(self, property_id, check_in, check_out, ignore_booking_id=None):
+        return self.conflict(property_id, check_in, check_out, ignore_booking_id) is None
+
+    def available_mask(self, rows, check_in, check_out):
+        """Boolean mask over catalog rows: True where every night of the stay is free"""
+        first, last = day_number(check_in), day_number(check_out)
+        with self.lock:
+            if self.bitsets.start != date.today().toordinal():
+                self.rebuild_bitsets()
+            bitsets = self.bitsets
+            available = ~bitsets.booked_mask(rows, first, last)
+            if not bitsets.covers(first, last):
+                # Nights outside the horizon fall back to the interval index, for booked rows only
+                for i in np.flatnonzero(available & (bitsets.slot_of_row[rows] >= 0)):
+                    calendar = self.properties.get(str(self.catalog.ids[rows[i]]))
+                    if calendar is not None and calendar.conflict(first, last) is not None:
+                        available[i] = False
+        return available
+
+    def stats(self):
+        with self.lock:
+            return {
+                'properties': len(self.properties),
+                'confirmed_bookings': len(self.positions),
+                'booked_rows': self.bitsets.slots if self.bitsets is not None else 0,
+                'seq': self.seq
+            }
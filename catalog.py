@@ -0,0 +1,523 @@
+import base64
+import hashlib
+import json
+
+import numpy as np
+
+from geo_index import GeoGridIndex
+
+# sort name -> (indexed column, descending)
+SORT_KEYS = {
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'rating_desc': ('rating', True),
+    'rating_asc': ('rating', False),
+}
+
+# Lower edges of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES = [0, 50, 100, 150, 200, 300, 500]
+
+
+def encode_cursor(sort, after):
+    """Opaque page cursor: the sort it belongs to and the last position served"""
+    payload = json.dumps({'sort': sort, 'after': after}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return the position a cursor resumes after; ValueError if it is malformed or for another sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, dict) or payload.get('sort') != sort:
+        raise ValueError('Cursor belongs to a different sort order')
+    return payload['after']
+
+
+def normalize_city(name):
+    """Normalize a city name for index lookups"""
+    return ' '.join(name.casefold().split())
+
+
+def stay_filter(filters):
+    """True when filters ask for a check_in/check_out date range"""
+    return bool(filters.get('check_in') and filters.get('check_out'))
+
+
+def encode_categories(values):
+    """Encode a list of strings as (vocabulary, int32 codes)"""
+    vocabulary = []
+    lookup = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        code = lookup.get(value)
+        if code is None:
+            code = len(vocabulary)
+            lookup[value] = code
+            vocabulary.append(value)
+        codes[i] = code
+    return vocabulary, codes
+
+
+def encode_sets(value_lists):
+    """Encode multi-valued rows as (sorted vocabulary, value -> column, boolean row x value matrix)"""
+    vocabulary = sorted({value for values in value_lists for value in values})
+    index = {value: i for i, value in enumerate(vocabulary)}
+    matrix = np.zeros((len(value_lists), len(vocabulary)), dtype=bool)
+    for row, values in enumerate(value_lists):
+        for value in values:
+            matrix[row, index[value]] = True
+    return vocabulary, index, matrix
+
+
+def price_bucket_labels(edges):
+    return [f'{low:g}-{high:g}' for low, high in zip(edges, edges[1:])] + [f'{edges[-1]:g}+']
+
+
+class SortedColumnIndex:
+    """Row ids of a numeric column kept in value order for range lookups"""
+
+    ranks = None
+
+    def __init__(self, values):
+        self.order = np.argsort(values, kind='stable').astype(np.int64)
+        self.sorted_values = values[self.order]
+
+    def bounds(self, low=None, high=None):
+        """Bisect the sorted values for the [low, high] slice"""
+        start = 0 if low is None else int(np.searchsorted(self.sorted_values, low, side='left'))
+        stop = len(self.order) if high is None else int(np.searchsorted(self.sorted_values, high, side='right'))
+        return start, max(start, stop)
+
+    def range(self, low=None, high=None):
+        """Return the (unsorted) row ids with low <= value <= high"""
+        start, stop = self.bounds(low, high)
+        return self.order[start:stop]
+
+    def positions(self, rows, descending=False):
+        """Position of each row in the sorted order (value, then row id; reversed when descending)"""
+        if self.ranks is None:
+            ranks = np.empty(len(self.order), dtype=np.int64)
+            ranks[self.order] = np.arange(len(self.order))
+            self.ranks = ranks
+        positions = self.ranks[rows]
+        return len(self.order) - 1 - positions if descending else positions
+
+    def rows_at(self, start, stop, descending=False):
+        """Row ids at sorted positions [start, stop)"""
+        if not descending:
+            return self.order[start:stop]
+        size = len(self.order)
+        return self.order[size - stop:size - start][::-1]
+
+
+class CatalogIndexes:
+    """Secondary indexes over a PropertyCatalog.
+
+    City and room_type are postings maps of sorted row ids, price and rating
+    are value-sorted permutations answered with bisect, and every activity
+    has a packed bitset so the any-of filter is a handful of byte ORs.
+    """
+
+    def __init__(self, catalog):
+        self.size = len(catalog)
+
+        self.city_postings = {}
+        self.city_key_codes = {}
+        for code, city in enumerate(catalog.cities):
+            key = normalize_city(city)
+            rows = np.flatnonzero(catalog.city_codes == code)
+            if key in self.city_postings:
+                rows = np.union1d(self.city_postings[key], rows)
+            self.city_postings[key] = rows
+            self.city_key_codes.setdefault(key, []).append(code)
+
+        self.room_type_postings = {
+            room_type: np.flatnonzero(catalog.room_type_codes == code)
+            for code, room_type in enumerate(catalog.room_types)
+        }
+
+        self.price = SortedColumnIndex(catalog.price)
+        self.rating = SortedColumnIndex(catalog.rating)
+        self.ids = SortedColumnIndex(catalog.ids)
+
+        self.activity_bitsets = {
+            activity: np.packbits(catalog.activity_matrix[:, column])
+            for activity, column in catalog.activity_index.items()
+        }
+        self.activity_counts = {
+            activity: int(catalog.activity_matrix[:, column].sum())
+            for activity, column in catalog.activity_index.items()
+        }
+
+    def city_keys(self, city):
+        """Normalized city keys containing the normalized query.
+
+        The substring match only walks the city vocabulary, never the rows.
+        """
+        key = normalize_city(city)
+        return [name for name in self.city_postings if key in name]
+
+    def city_rows(self, keys):
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        if len(keys) == 1:
+            return self.city_postings[keys[0]]
+        return np.sort(np.concatenate([self.city_postings[key] for key in keys]))
+
+    def city_codes(self, keys):
+        return np.array([code for key in keys for code in self.city_key_codes[key]], dtype=np.int32)
+
+    def id_row(self, property_id):
+        """Row id of a property id (bisected in the sorted id column), or None"""
+        start, stop = self.ids.bounds(property_id, property_id)
+        return int(self.ids.order[start]) if stop > start else None
+
+    def room_type_rows(self, room_type):
+        return self.room_type_postings.get(room_type, np.empty(0, dtype=np.int64))
+
+    def activity_bitset(self, activities):
+        """OR the bitsets of the requested activities (None if none are known)"""
+        bitset = None
+        for activity in activities:
+            bits = self.activity_bitsets.get(activity)
+            if bits is None:
+                continue
+            bitset = bits.copy() if bitset is None else np.bitwise_or(bitset, bits, out=bitset)
+        return bitset
+
+    def bitset_contains(self, bitset, rows):
+        """Test membership of many row ids in a packed bitset"""
+        return ((bitset[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+    def bitset_rows(self, bitset):
+        return np.flatnonzero(np.unpackbits(bitset, count=self.size))
+
+    def plans(self, filters):
+        """(estimated size, name, producer) for every indexable filter; None if nothing can match"""
+        min_price = filters.get('min_price') or None
+        max_price = filters.get('max_price') or None
+        min_rating = filters.get('min_rating') or None
+
+        plans = []
+        city_keys = None
+        if filters.get('city'):
+            city_keys = self.city_keys(filters['city'])
+            estimate = sum(len(self.city_postings[key]) for key in city_keys)
+            plans.append((estimate, 'city', lambda: self.city_rows(city_keys)))
+        if filters.get('room_type'):
+            postings = self.room_type_rows(filters['room_type'])
+            plans.append((len(postings), 'room_type', lambda: postings))
+        if min_price is not None or max_price is not None:
+            start, stop = self.price.bounds(min_price, max_price)
+            plans.append((stop - start, 'price', lambda s=start, e=stop: np.sort(self.price.order[s:e])))
+        if min_rating is not None:
+            start, stop = self.rating.bounds(min_rating)
+            plans.append((stop - start, 'rating', lambda s=start, e=stop: np.sort(self.rating.order[s:e])))
+        if filters.get('activities'):
+            activity_bits = self.activity_bitset(filters['activities'])
+            if activity_bits is None:
+                return None
+            estimate = sum(self.activity_counts.get(a, 0) for a in set(filters['activities']))
+            plans.append((estimate, 'activities', lambda: self.bitset_rows(activity_bits)))
+        return plans
+
+    def candidates(self, catalog, filters):
+        """Return the sorted row ids matching filters.
+
+        Each indexable filter is costed by its postings size; the smallest
+        one is materialized and the remaining predicates are checked only on
+        those rows, so the work follows the result size, not the catalog.
+        """
+        plans = self.plans(filters)
+        if plans is None:
+            return np.empty(0, dtype=np.int64)
+        if not plans:
+            rows = np.arange(self.size)
+            return self.refine(catalog, rows, filters) if stay_filter(filters) else rows
+
+        plans.sort(key=lambda plan: plan[0])
+        rows = plans[0][2]()
+        if len(rows) == 0:
+            return rows
+        return self.refine(catalog, rows, filters, skip=plans[0][1])
+
+    def refine(self, catalog, rows, filters, skip=None):
+        """Keep only the rows that satisfy filters, touching just those rows"""
+        return rows[self.refine_mask(catalog, rows, filters, skip)]
+
+    def refine_mask(self, catalog, rows, filters, skip=None):
+        keep = np.ones(len(rows), dtype=bool)
+
+        if filters.get('city') and skip != 'city':
+            keep &= np.isin(catalog.city_codes[rows], self.city_codes(self.city_keys(filters['city'])))
+
+        if filters.get('room_type') and skip != 'room_type':
+            if filters['room_type'] in self.room_type_postings:
+                keep &= catalog.room_type_codes[rows] == catalog.room_types.index(filters['room_type'])
+            else:
+                keep[:] = False
+
+        if (filters.get('min_price') or filters.get('max_price')) and skip != 'price':
+            prices = catalog.price[rows]
+            if filters.get('min_price'):
+                keep &= prices >= filters['min_price']
+            if filters.get('max_price'):
+                keep &= prices <= filters['max_price']
+
+        if filters.get('min_rating') and skip != 'rating':
+            keep &= catalog.rating[rows] >= filters['min_rating']
+
+        if filters.get('activities') and skip != 'activities':
+            activity_bits = self.activity_bitset(filters['activities'])
+            if activity_bits is None:
+                keep[:] = False
+            else:
+                keep &= self.bitset_contains(activity_bits, rows)
+
+        if stay_filter(filters) and catalog.availability is not None and keep.any():
+            keep[keep] = catalog.availability.available_mask(rows[keep], filters['check_in'], filters['check_out'])
+
+        return keep
+
+    def page(self, catalog, filters, sort=None, after=None, limit=20):
+        """Keyset page: matching rows at sort positions after `after`, and their positions.
+
+        Catalog order uses the row id as its position; price and rating
+        orders use the presorted permutations, so no per-request sort is
+        needed. Selective filters materialize their candidates and pick the
+        next `limit` positions with a partial sort; broad ones walk the
+        permutation from the cursor and refine chunk by chunk. Either way
+        the cost does not grow with page depth.
+        """
+        after = -1 if after is None else int(after)
+        plans = self.plans(filters)
+        if plans is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        start, stop = 0, self.size
+        if sort is None:
+            # Catalog order: a row's position is its id
+            column = None
+            rows_at = lambda first, last: np.arange(first, last)
+            positions_of = lambda rows: rows
+            own = []
+        else:
+            column, descending = SORT_KEYS[sort]
+            index = getattr(self, column)
+            rows_at = lambda first, last: index.rows_at(first, last, descending)
+            positions_of = lambda rows: index.positions(rows, descending)
+            # The sort column's own range filter is a contiguous window of its permutation
+            own = [plan for plan in plans if plan[1] == column]
+            if own:
+                low, high = (filters.get('min_price') or None, filters.get('max_price') or None) \
+                    if column == 'price' else (filters.get('min_rating') or None, None)
+                start, stop = index.bounds(low, high)
+                if descending:
+                    start, stop = self.size - stop, self.size - start
+        start = max(start, after + 1)
+        if start >= stop:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        others = [plan for plan in plans if plan[1] != column]
+        estimate = min([plan[0] for plan in others] + [stop - start])
+        # Scanning costs about limit / selectivity rows; materializing costs the estimate
+        if estimate * estimate >= limit * (stop - start) or not others:
+            skip = column if own else None
+            found_rows, found_positions = [], []
+            found = 0
+            chunk = max(4 * limit, 4096)
+            while found < limit and start < stop:
+                rows = rows_at(start, min(start + chunk, stop))
+                keep = self.refine_mask(catalog, rows, filters, skip=skip)
+                kept = np.flatnonzero(keep)[:limit - found]
+                found_rows.append(rows[kept])
+                found_positions.append(start + kept)
+                found += len(kept)
+                start += chunk
+                chunk *= 2
+            return np.concatenate(found_rows), np.concatenate(found_positions)
+
+        rows = self.candidates(catalog, filters)
+        positions = positions_of(rows)
+        keep = (positions >= start) & (positions < stop)
+        rows, positions = rows[keep], positions[keep]
+        if len(rows) > limit:
+            nearest = np.argpartition(positions, limit - 1)[:limit]
+            rows, positions = rows[nearest], positions[nearest]
+        order = np.argsort(positions)
+        return rows[order], positions[order]
+
+
+class CatalogBuilder:
+    """Accumulate property chunks and their numeric columns into a catalog"""
+
+    def __init__(self):
+        self.properties = []
+        self.column_chunks = {name: [] for name in PropertyCatalog.NUMERIC_COLUMNS}
+
+    def __len__(self):
+        return len(self.properties)
+
+    def add_chunk(self, properties, columns):
+        """Append one chunk of property dicts with matching numeric arrays"""
+        for name, dtype in PropertyCatalog.NUMERIC_COLUMNS.items():
+            values = np.asarray(columns[name], dtype=dtype)
+            if len(values) != len(properties):
+                raise ValueError(f"Column '{name}' has {len(values)} rows, expected {len(properties)}")
+            self.column_chunks[name].append(values)
+        self.properties.extend(properties)
+
+    def build(self):
+        columns = {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=PropertyCatalog.NUMERIC_COLUMNS[name])
+            for name, chunks in self.column_chunks.items()
+        }
+        return PropertyCatalog(self.properties, columns=columns)
+
+
+class PropertyCatalog:
+    """Columnar, NumPy-backed view of the property listings.
+
+    Numeric fields live in contiguous arrays, city and room_type are stored
+    as categorical codes and activities as a boolean row x activity matrix,
+    so any filter can be evaluated as one vectorized boolean mask. Searches
+    go through CatalogIndexes. The original dicts are kept as the row store
+    so API payloads don't change.
+    """
+
+    NUMERIC_COLUMNS = {
+        'price': np.float64,
+        'rating': np.float64,
+        'accommodates': np.int32,
+        'bedrooms': np.int32,
+        'latitude': np.float64,
+        'longitude': np.float64,
+    }
+
+    # Set by AvailabilityCalendar.attach to serve check_in/check_out filters
+    availability = None
+    # Content hash of the rows, computed on first use (snapshots carry it precomputed)
+    version = None
+
+    def __init__(self, properties, columns=None):
+        """Build the catalog from property dicts.
+
+        columns may supply prebuilt numeric arrays (e.g. from a bulk loader)
+        so they don't have to be re-extracted from the dicts.
+        """
+        self.properties = list(properties)
+        columns = columns or {}
+
+        for name, dtype in self.NUMERIC_COLUMNS.items():
+            if name in columns:
+                values = np.ascontiguousarray(columns[name], dtype=dtype)
+            else:
+                values = np.array([p[name] for p in self.properties], dtype=dtype)
+            setattr(self, name, values)
+
+        # Property ids as strings, the form bookings refer to them by
+        self.ids = np.array([str(p['id']) for p in self.properties], dtype=str)
+        self.cities, self.city_codes = encode_categories([p['city'] for p in self.properties])
+        self.room_types, self.room_type_codes = encode_categories([p['room_type'] for p in self.properties])
+
+        # Activities and amenities are multi-valued, so they get boolean matrices instead of codes
+        self.activities, self.activity_index, self.activity_matrix = encode_sets(
+            [p['activities'] for p in self.properties])
+        self.amenities, self.amenity_index, self.amenity_matrix = encode_sets(
+            [p.get('amenities') or [] for p in self.properties])
+
+        self.indexes = CatalogIndexes(self)
+        self.geo_index = GeoGridIndex(self.latitude, self.longitude)
+
+    def __len__(self):
+        return len(self.properties)
+
+    def content_version(self):
+        """SHA-1 of the rows' compact JSON, the same digest a snapshot of this catalog records"""
+        if self.version is None:
+            digest = hashlib.sha1()
+            for p in self.properties:
+                digest.update(json.dumps(p, separators=(',', ':')).encode('utf-8'))
+            self.version = digest.hexdigest()
+        return self.version
+
+    def facets(self, rows, price_edges=PRICE_BUCKET_EDGES):
+        """Count rows per room_type, city, price bucket, amenity and activity (zero counts omitted).
+
+        Every facet is a bincount over codes or a column sum over a boolean
+        matrix, so the whole result is a few vectorized passes over rows.
+        """
+        def named(vocabulary, counts):
+            return {name: int(count) for name, count in zip(vocabulary, counts) if count}
+
+        buckets = np.searchsorted(price_edges, self.price[rows], side='right') - 1
+        return {
+            'room_type': named(self.room_types, np.bincount(self.room_type_codes[rows],
+                                                            minlength=len(self.room_types))),
+            'city': named(self.cities, np.bincount(self.city_codes[rows], minlength=len(self.cities))),
+            'price': named(price_bucket_labels(price_edges),
+                           np.bincount(np.maximum(buckets, 0), minlength=len(price_edges))),
+            'amenities': named(self.amenities, self.amenity_matrix[rows].sum(axis=0)),
+            'activities': named(self.activities, self.activity_matrix[rows].sum(axis=0)),
+        }
+
+    def facet_counts(self, filters):
+        """Facet counts over every row matching filters, not just one page"""
+        return self.facets(self.indexes.candidates(self, filters))
+
+    def row_of(self, property_id):
+        """Row id of a property, or None if it isn't in the catalog"""
+        return self.indexes.id_row(str(property_id))
+
+    def rows(self, indices):
+        """Return the property dicts for the given row ids"""
+        return [self.properties[i] for i in indices]
+
+    def search(self, filters, limit=20):
+        """Return up to limit matching properties in catalog order"""
+        indices = self.indexes.candidates(self, filters)
+        return self.rows(indices[:limit])
+
+    def search_page(self, filters, sort=None, cursor=None, limit=20):
+        """Return (properties, next cursor or None) for one page of a sorted search"""
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort: {sort} (expected one of {', '.join(SORT_KEYS)})")
+        after = decode_cursor(cursor, sort) if cursor else None
+        # One extra row tells whether another page exists
+        rows, positions = self.indexes.page(self, filters, sort=sort, after=after, limit=limit + 1)
+        next_cursor = encode_cursor(sort, int(positions[limit - 1])) if len(rows) > limit else None
+        return self.rows(rows[:limit]), next_cursor
+
+    def search_nearby(self, filters, latitude=None, longitude=None, radius_km=None, bbox=None, limit=20,
+                      cursor=None):
+        """Return (properties, next cursor or None) around a point (nearest first) or inside a bbox.
+
+        Other search filters are applied to the spatial candidates only.
+        Results are copies carrying distance_km when a point was given.
+        Point searches page by the (distance, row) key, bbox searches by row.
+        """
+        if bbox is not None:
+            south, west, north, east = bbox
+            rows = np.sort(self.geo_index.within_bbox(south, west, north, east))
+            if cursor:
+                rows = rows[np.searchsorted(rows, decode_cursor(cursor, None), side='right'):]
+            rows = self.indexes.refine(self, rows, filters)
+            next_cursor = encode_cursor(None, int(rows[limit - 1])) if len(rows) > limit else None
+            return self.rows(rows[:limit]), next_cursor
+
+        rows, distances = self.geo_index.within_radius(latitude, longitude, radius_km)
+        order = np.lexsort((rows, distances))
+        rows, distances = rows[order], distances[order]
+        if cursor:
+            last_distance, last_row = decode_cursor(cursor, 'distance')
+            later = (distances > last_distance) | ((distances == last_distance) & (rows > last_row))
+            rows, distances = rows[later], distances[later]
+        keep = self.indexes.refine_mask(self, rows, filters)
+        rows, distances = rows[keep], distances[keep]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor('distance', [float(distances[limit - 1]), int(rows[limit - 1])])
+        rows, distances = rows[:limit], distances[:limit]
+        return [dict(p, distance_km=round(float(d), 3)) for p, d in zip(self.rows(rows), distances)], next_cursor
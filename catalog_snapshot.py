@@ -0,0 +1,227 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from datetime import datetime
+
+import numpy as np
+
+from catalog import CatalogIndexes, PropertyCatalog, SortedColumnIndex
+from geo_index import GeoGridIndex
+
+MAGIC = b'TRVLCAT\0'
+FORMAT_VERSION = 3
+HEADER = struct.Struct('<8sIIQ')  # magic, format version, reserved, manifest length
+ALIGNMENT = 64
+
+
+class SnapshotRows(Sequence):
+    """Property dicts decoded on demand from the snapshot's row table"""
+
+    def __init__(self, buffer, start, offsets):
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('snapshot row index out of range')
+        return json.loads(self.buffer[self.start + int(self.offsets[index]):self.start + int(self.offsets[index + 1])])
+
+
+def pack_postings(postings):
+    """Flatten a {key: row ids} map into keys, one concatenated array and offsets"""
+    keys = list(postings)
+    lengths = [len(postings[key]) for key in keys]
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    values = np.concatenate([postings[key] for key in keys]).astype(np.int64) if keys else np.empty(0, dtype=np.int64)
+    return keys, values, offsets
+
+
+def unpack_postings(keys, values, offsets):
+    return {key: values[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+
+def catalog_state(catalog):
+    """Split a catalog into (JSON metadata, named arrays)"""
+    indexes = catalog.indexes
+    city_keys, city_rows, city_offsets = pack_postings(indexes.city_postings)
+    room_keys, room_rows, room_offsets = pack_postings(indexes.room_type_postings)
+
+    rows = [json.dumps(p, separators=(',', ':')).encode('utf-8') for p in catalog.properties]
+    row_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    row_offsets[1:] = np.cumsum([len(row) for row in rows])
+    row_data = np.frombuffer(b''.join(rows), dtype=np.uint8)
+
+    activity_bitsets = np.stack([indexes.activity_bitsets[a] for a in catalog.activities]) \
+        if catalog.activities else np.empty((0, 0), dtype=np.uint8)
+
+    meta = {
+        'rows': len(catalog),
+        'cities': catalog.cities,
+        'room_types': catalog.room_types,
+        'activities': catalog.activities,
+        'activity_counts': [indexes.activity_counts[a] for a in catalog.activities],
+        'amenities': catalog.amenities,
+        'city_keys': city_keys,
+        'city_key_codes': [indexes.city_key_codes[key] for key in city_keys],
+        'room_type_keys': room_keys,
+        'geo_cell_degrees': catalog.geo_index.cell_degrees,
+        'catalog_version': hashlib.sha1(row_data.tobytes()).hexdigest(),
+    }
+    arrays = {name: getattr(catalog, name) for name in PropertyCatalog.NUMERIC_COLUMNS}
+    arrays.update({
+        'ids': catalog.ids,
+        'city_codes': catalog.city_codes,
+        'room_type_codes': catalog.room_type_codes,
+        'activity_matrix': catalog.activity_matrix,
+        'amenity_matrix': catalog.amenity_matrix,
+        'city_postings': city_rows,
+        'city_offsets': city_offsets,
+        'room_type_postings': room_rows,
+        'room_type_offsets': room_offsets,
+        'price_order': indexes.price.order,
+        'price_sorted': indexes.price.sorted_values,
+        'rating_order': indexes.rating.order,
+        'rating_sorted': indexes.rating.sorted_values,
+        'id_order': indexes.ids.order,
+        'id_sorted': indexes.ids.sorted_values,
+        'activity_bitsets': activity_bitsets,
+        'geo_order': catalog.geo_index.order,
+        'geo_sorted_keys': catalog.geo_index.sorted_keys,
+        'row_offsets': row_offsets,
+        'row_data': row_data,
+    })
+    return meta, arrays
+
+
+def write_snapshot(catalog, path):
+    """Compile a catalog and its indexes into a versioned snapshot file"""
+    meta, arrays = catalog_state(catalog)
+
+    # Arrays are laid out at aligned offsets relative to the end of the manifest
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {'offset': position, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    manifest = {'format_version': FORMAT_VERSION, 'created_at': datetime.now().isoformat(),
+                'meta': meta, 'arrays': layout}
+    manifest_bytes = json.dumps(manifest).encode('utf-8')
+    data_start = -(-(HEADER.size + len(manifest_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + position)
+    # Atomic replace so workers never map a half-written file
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def open_snapshot(path):
+    """Map a snapshot read-only and return a PropertyCatalog over its pages.
+
+    Nothing is copied or rebuilt: every column and index is a NumPy view on
+    the shared mapping, and property dicts are decoded only when returned.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, _, manifest_length = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a catalog snapshot')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'{path} has snapshot format {version}, expected {FORMAT_VERSION}')
+    manifest = json.loads(buffer[HEADER.size:HEADER.size + manifest_length])
+    data_start = -(-(HEADER.size + manifest_length) // ALIGNMENT) * ALIGNMENT
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+    rows = SnapshotRows(buffer, data_start + manifest['arrays']['row_data']['offset'], arrays['row_offsets'])
+    return restore_catalog(manifest['meta'], arrays, rows, buffer)
+
+
+def restore_catalog(meta, arrays, rows, buffer):
+    """Reassemble catalog, indexes and geo index around the mapped arrays"""
+    catalog = PropertyCatalog.__new__(PropertyCatalog)
+    catalog.properties = rows
+    for name in PropertyCatalog.NUMERIC_COLUMNS:
+        setattr(catalog, name, arrays[name])
+    catalog.ids = arrays['ids']
+    catalog.cities = meta['cities']
+    catalog.city_codes = arrays['city_codes']
+    catalog.room_types = meta['room_types']
+    catalog.room_type_codes = arrays['room_type_codes']
+    catalog.activities = meta['activities']
+    catalog.activity_index = {activity: i for i, activity in enumerate(catalog.activities)}
+    catalog.activity_matrix = arrays['activity_matrix']
+    catalog.amenities = meta['amenities']
+    catalog.amenity_index = {amenity: i for i, amenity in enumerate(catalog.amenities)}
+    catalog.amenity_matrix = arrays['amenity_matrix']
+
+    indexes = CatalogIndexes.__new__(CatalogIndexes)
+    indexes.size = meta['rows']
+    indexes.city_postings = unpack_postings(meta['city_keys'], arrays['city_postings'], arrays['city_offsets'])
+    indexes.city_key_codes = dict(zip(meta['city_keys'], meta['city_key_codes']))
+    indexes.room_type_postings = unpack_postings(meta['room_type_keys'], arrays['room_type_postings'],
+                                                 arrays['room_type_offsets'])
+    indexes.price = SortedColumnIndex.__new__(SortedColumnIndex)
+    indexes.price.order, indexes.price.sorted_values = arrays['price_order'], arrays['price_sorted']
+    indexes.rating = SortedColumnIndex.__new__(SortedColumnIndex)
+    indexes.rating.order, indexes.rating.sorted_values = arrays['rating_order'], arrays['rating_sorted']
+    indexes.ids = SortedColumnIndex.__new__(SortedColumnIndex)
+    indexes.ids.order, indexes.ids.sorted_values = arrays['id_order'], arrays['id_sorted']
+    indexes.activity_bitsets = {a: arrays['activity_bitsets'][i] for i, a in enumerate(catalog.activities)}
+    indexes.activity_counts = dict(zip(catalog.activities, meta['activity_counts']))
+    catalog.indexes = indexes
+
+    geo_index = GeoGridIndex.__new__(GeoGridIndex)
+    geo_index.cell_degrees = meta['geo_cell_degrees']
+    geo_index.columns = int(np.ceil(360.0 / geo_index.cell_degrees))
+    geo_index.bands = int(np.ceil(180.0 / geo_index.cell_degrees))
+    geo_index.latitudes, geo_index.longitudes = catalog.latitude, catalog.longitude
+    geo_index.order, geo_index.sorted_keys = arrays['geo_order'], arrays['geo_sorted_keys']
+    catalog.geo_index = geo_index
+
+    catalog.version = meta['catalog_version']
+    catalog.snapshot = buffer
+    return catalog
+
+
+if __name__ == '__main__':
+    from listings_loader import ListingsLoader
+
+    parser = argparse.ArgumentParser(description='Compile a listings dump into a memory-mappable catalog snapshot')
+    parser.add_argument('listings', help='Path to listings.csv or listings.csv.gz')
+    parser.add_argument('output', help='Snapshot file to write')
+    parser.add_argument('--city', help='City name to assign to every listing (default: neighbourhood)')
+    parser.add_argument('--country', help='Country name to assign to every listing')
+    args = parser.parse_args()
+
+    catalog = ListingsLoader(args.listings, city=args.city, country=args.country).load()
+    manifest = write_snapshot(catalog, args.output)
+    print(f"Wrote {manifest['meta']['rows']:,} listings to {args.output} "
+          f"(catalog version {manifest['meta']['catalog_version'][:12]})")
@@ -3,10 +3,16 @@ import hashlib
 import json
 from datetime import datetime
 import os
+import threading
+import uuid
+
+BOOKING_COLUMNS = ['booking_id', 'property_id', 'user_id', 'check_in', 'check_out', 'guests',
+                   'total_price', 'status', 'created_at', 'updated_at']
 
 class TravelDatabase:
     def __init__(self, db_path="travel_platform.db"):
         self.db_path = db_path
+        self.ledger = threading.local()
         self.init_database()
     
     def init_database(self):
@@ -61,6 +67,46 @@ class TravelDatabase:
             )
         ''')
         
+        # Traveler profiles for social matching
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS traveler_profiles (
+                user_id TEXT PRIMARY KEY,
+                profile_data TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Booking ledger: check_in/check_out are ISO dates, check_out exclusive
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bookings (
+                booking_id TEXT PRIMARY KEY,
+                property_id TEXT NOT NULL,
+                user_id TEXT,
+                check_in TEXT NOT NULL,
+                check_out TEXT NOT NULL,
+                guests INTEGER,
+                total_price REAL,
+                status TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bookings_calendar
+            ON bookings (property_id, status, check_in)
+        ''')
+        
+        # Append-only change feed so every worker's availability calendar can catch up
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS booking_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                booking_id TEXT NOT NULL
+            )
+        ''')
+        
+        # WAL lets readers run alongside the single booking writer
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         conn.commit()
         conn.close()
     
@@ -196,3 +242,201 @@ class TravelDatabase:
             }
             for plan in plans
         ]
+    
+    def save_traveler_profile(self, profile):
+        """Save (or replace) a traveler's matching profile"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO traveler_profiles (user_id, profile_data, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (str(profile['user_id']), json.dumps(profile, default=str)))
+        
+        conn.commit()
+        conn.close()
+    
+    def iter_traveler_profiles(self, batch_size=10000):
+        """Yield every saved traveler profile, fetching in batches"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT profile_data FROM traveler_profiles')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield json.loads(row[0])
+        finally:
+            conn.close()
+    
+    def connect_ledger(self):
+        """This thread's connection for booking writes: explicit transactions, WAL-friendly durability.
+        
+        Opened (and its pragmas set) once per thread and process; a connection
+        inherited across fork() is never reused.
+        """
+        conn = getattr(self.ledger, 'conn', None)
+        if conn is None or self.ledger.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.ledger.conn, self.ledger.pid = conn, os.getpid()
+        return conn
+    
+    def booking_conflict(self, cursor, property_id, check_in, check_out, ignore_booking_id=''):
+        """Id of a confirmed booking overlapping [check_in, check_out), or None.
+        
+        Confirmed bookings of a property never overlap, so only the one with
+        the latest check_in before check_out can collide: one index seek.
+        """
+        cursor.execute('''
+            SELECT booking_id, check_out FROM bookings
+            WHERE property_id = ? AND status = 'confirmed' AND check_in < ? AND booking_id != ?
+            ORDER BY check_in DESC LIMIT 1
+        ''', (property_id, check_out, ignore_booking_id))
+        
+        row = cursor.fetchone()
+        if row and row[1] > check_in:
+            return row[0]
+        return None
+    
+    def create_booking(self, booking):
+        """Atomically check availability and insert a confirmed booking; None if the dates are taken"""
+        conn = self.connect_ledger()
+        cursor = conn.cursor()
+        
+        booking_id = f'booking_{uuid.uuid4().hex[:16]}'
+        try:
+            # BEGIN IMMEDIATE takes the write lock first, so check-then-insert is atomic across processes
+            cursor.execute('BEGIN IMMEDIATE')
+            if self.booking_conflict(cursor, booking['property_id'], booking['check_in'], booking['check_out']):
+                cursor.execute('ROLLBACK')
+                return None
+            
+            cursor.execute('''
+                INSERT INTO bookings (booking_id, property_id, user_id, check_in, check_out,
+                                      guests, total_price, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'confirmed')
+            ''', (
+                booking_id, booking['property_id'], booking.get('user_id'),
+                booking['check_in'], booking['check_out'],
+                booking.get('guests', 1), booking.get('total_price')
+            ))
+            cursor.execute('INSERT INTO booking_changes (booking_id) VALUES (?)', (booking_id,))
+            booking = self.fetch_booking(cursor, booking_id)
+            cursor.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.close()
+        
+        return booking
+    
+    def modify_booking(self, booking_id, changes):
+        """Change a booking's dates/guests/price atomically; None if missing, not confirmed or the new dates are taken"""
+        conn = self.connect_ledger()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT property_id, check_in, check_out, guests, total_price FROM bookings
+                WHERE booking_id = ? AND status = 'confirmed'
+            ''', (booking_id,))
+            
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('ROLLBACK')
+                return None
+            
+            property_id, check_in, check_out, guests, total_price = row
+            check_in = changes.get('check_in', check_in)
+            check_out = changes.get('check_out', check_out)
+            if self.booking_conflict(cursor, property_id, check_in, check_out, ignore_booking_id=booking_id):
+                cursor.execute('ROLLBACK')
+                return None
+            
+            cursor.execute('''
+                UPDATE bookings SET check_in = ?, check_out = ?, guests = ?, total_price = ?,
+                                    updated_at = CURRENT_TIMESTAMP
+                WHERE booking_id = ?
+            ''', (check_in, check_out, changes.get('guests', guests),
+                  changes.get('total_price', total_price), booking_id))
+            cursor.execute('INSERT INTO booking_changes (booking_id) VALUES (?)', (booking_id,))
+            booking = self.fetch_booking(cursor, booking_id)
+            cursor.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.close()
+        
+        return booking
+    
+    def cancel_booking(self, booking_id):
+        """Cancel a confirmed booking and free its nights; None if there was nothing to cancel"""
+        conn = self.connect_ledger()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                UPDATE bookings SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE booking_id = ? AND status = 'confirmed'
+            ''', (booking_id,))
+            
+            if cursor.rowcount == 0:
+                cursor.execute('ROLLBACK')
+                return None
+            cursor.execute('INSERT INTO booking_changes (booking_id) VALUES (?)', (booking_id,))
+            booking = self.fetch_booking(cursor, booking_id)
+            cursor.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.close()
+        
+        return booking
+    
+    def fetch_booking(self, cursor, booking_id):
+        cursor.execute(f'''
+            SELECT {', '.join(BOOKING_COLUMNS)} FROM bookings WHERE booking_id = ?
+        ''', (booking_id,))
+        
+        row = cursor.fetchone()
+        if row:
+            return dict(zip(BOOKING_COLUMNS, row))
+        return None
+    
+    def get_booking(self, booking_id):
+        """Get a booking by id"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return self.fetch_booking(conn.cursor(), booking_id)
+        finally:
+            conn.close()
+    
+    def get_booking_changes(self, since_seq=0, limit=10000):
+        """Bookings changed after since_seq, as (last seq, [booking, ...])"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT c.seq, {', '.join('b.' + column for column in BOOKING_COLUMNS)}
+            FROM booking_changes c JOIN bookings b ON b.booking_id = c.booking_id
+            WHERE c.seq > ? ORDER BY c.seq LIMIT ?
+        ''', (since_seq, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        if not rows:
+            return since_seq, []
+        return rows[-1][0], [dict(zip(BOOKING_COLUMNS, row[1:])) for row in rows]
@@ -0,0 +1,248 @@
+import bisect
+import csv
+import heapq
+import math
+import os
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+NO_ROWS = np.empty(0, dtype=np.int32)
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.csv')
+
+
+def normalize_place(name):
+    """Casefold, strip accents and punctuation, and collapse whitespace"""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = ''.join(c if c.isalnum() else ' ' for c in name.casefold())
+    return ' '.join(name.split())
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """Offline place-name index: name -> coordinates without any network call.
+
+    Every place is indexed under its normalized name and aliases in an
+    exact map, a sorted key list for prefix lookups (bisect) and a
+    trigram -> key rows postings map for typo-tolerant fuzzy matches.
+    "Paris, France" style queries use the part after the comma to pick
+    among same-named places.
+
+    Neither non-exact path scans the index: prefix lookups only rank the
+    keys in their bisected range by each key's largest population, and
+    fuzzy lookups gather candidates from a query's rarest trigrams only
+    (enough that no key above the similarity threshold can be missed),
+    drop those of very different length and score the rest with NumPy.
+    """
+
+    def __init__(self, places=()):
+        self.places = []
+        self.exact = defaultdict(list)
+        self.trigram_postings = defaultdict(set)
+        self.trigram_counts = {}
+        self.sorted_keys = []
+        self.key_populations = np.empty(0, dtype=np.int64)
+        self.key_trigram_counts = np.empty(0, dtype=np.int64)
+        self.gram_rows = {}
+        for place in places:
+            self.add(place)
+        self.finalize()
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_GAZETTEER_PATH):
+        """Load a name,admin,country,latitude,longitude,population,aliases CSV"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls(
+                {
+                    'name': row['name'],
+                    'admin': row.get('admin') or None,
+                    'country': row.get('country') or None,
+                    'latitude': float(row['latitude']),
+                    'longitude': float(row['longitude']),
+                    'population': int(row.get('population') or 0),
+                    'aliases': [a for a in (row.get('aliases') or '').split('|') if a],
+                }
+                for row in csv.DictReader(f)
+            )
+
+    @classmethod
+    def from_geonames(cls, path, min_population=0):
+        """Load a GeoNames cities*.txt dump (tab-separated, no header)"""
+        def places():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    fields = line.rstrip('\n').split('\t')
+                    population = int(fields[14] or 0)
+                    if population < min_population:
+                        continue
+                    yield {
+                        'name': fields[1],
+                        'admin': fields[10] or None,
+                        'country': fields[8] or None,
+                        'latitude': float(fields[4]),
+                        'longitude': float(fields[5]),
+                        'population': population,
+                        'aliases': [fields[2]] if fields[2] != fields[1] else [],
+                    }
+        return cls(places())
+
+    def add(self, place):
+        place_id = len(self.places)
+        self.places.append(place)
+        for name in [place['name']] + list(place.get('aliases', [])):
+            key = normalize_place(name)
+            if not key:
+                continue
+            if key not in self.exact:
+                grams = trigrams(key)
+                self.trigram_counts[key] = len(grams)
+                for gram in grams:
+                    self.trigram_postings[gram].add(key)
+            self.exact[key].append(place_id)
+
+    def finalize(self):
+        """Rebuild the prefix index after adding places"""
+        self.sorted_keys = sorted(self.exact)
+        # Larger places win ties between same-named entries
+        for ids in self.exact.values():
+            ids.sort(key=lambda place_id: -self.places[place_id]['population'])
+        # A key ranks by its largest place, the first of its sorted ids
+        self.key_populations = np.array([self.places[self.exact[key][0]]['population'] for key in self.sorted_keys],
+                                        dtype=np.int64)
+        # Trigram postings as sorted key rows, for vectorized fuzzy matching
+        row_of = {key: row for row, key in enumerate(self.sorted_keys)}
+        self.key_trigram_counts = np.array([self.trigram_counts[key] for key in self.sorted_keys], dtype=np.int64)
+        self.gram_rows = {gram: np.sort(np.fromiter((row_of[key] for key in keys), dtype=np.int32, count=len(keys)))
+                          for gram, keys in self.trigram_postings.items()}
+
+    def __len__(self):
+        return len(self.places)
+
+    def qualifies(self, place, qualifier):
+        return not qualifier or any(
+            normalize_place(place.get(field) or '') == qualifier for field in ('country', 'admin')
+        )
+
+    def best(self, ids, qualifier):
+        for place_id in ids:
+            if self.qualifies(self.places[place_id], qualifier):
+                return self.places[place_id]
+        return None
+
+    def prefix(self, text, limit=10):
+        """Places whose name or alias starts with text, largest first"""
+        key = normalize_place(text)
+        start = bisect.bisect_left(self.sorted_keys, key)
+        stop = bisect.bisect_left(self.sorted_keys, key + '\U0010ffff', start)
+        populations = self.key_populations[start:stop]
+        # Take the most populous keys until limit distinct places lead them (a place's
+        # aliases can take several key slots), then rank just those keys' places
+        count = limit
+        while True:
+            rows = start + (np.argpartition(-populations, count)[:count] if count < len(populations)
+                            else np.arange(len(populations)))
+            leaders = {self.exact[self.sorted_keys[row]][0] for row in rows}
+            if len(leaders) >= limit or len(rows) == stop - start:
+                break
+            count *= 2
+        ids = {place_id for row in rows for place_id in self.exact[self.sorted_keys[row]]}
+        return [self.places[i] for i in heapq.nlargest(limit, ids, key=lambda i: self.places[i]['population'])]
+
+    def fuzzy(self, key, min_similarity=0.56):
+        """Best trigram-Jaccard match for key as (place ids, similarity)"""
+        grams = trigrams(key)
+        # Jaccard >= min_similarity needs at least min_similarity * len(grams) shared trigrams,
+        # so a key that can qualify appears in the postings of any len(grams) - needed + 1 of them
+        needed = math.ceil(min_similarity * len(grams))
+        postings = sorted((self.gram_rows.get(gram, NO_ROWS) for gram in grams), key=len)
+        rows = np.unique(np.concatenate(postings[:len(grams) - needed + 1]))
+        counts = self.key_trigram_counts[rows]
+        comparable = (counts >= min_similarity * len(grams)) & (counts <= len(grams) / min_similarity)
+        rows, counts = rows[comparable], counts[comparable]
+        if len(rows) == 0:
+            return [], 0.0
+
+        # Exact overlap of the surviving candidates: one vectorized bisect per trigram
+        shared = np.zeros(len(rows), dtype=np.int64)
+        for posting in postings:
+            if len(posting):
+                positions = np.minimum(np.searchsorted(posting, rows), len(posting) - 1)
+                shared += posting[positions] == rows
+        scores = shared / (len(grams) + counts - shared)
+        best = int(np.argmax(scores))
+        if scores[best] < min_similarity:
+            return [], 0.0
+        return self.exact[self.sorted_keys[rows[best]]], float(scores[best])
+
+    def lookup(self, query):
+        """Resolve a place name to a place dict (exact, then prefix, then fuzzy), or None"""
+        name, _, qualifier = str(query).partition(',')
+        key, qualifier = normalize_place(name), normalize_place(qualifier)
+        if not key:
+            return None
+
+        if key in self.exact:
+            place = self.best(self.exact[key], qualifier)
+            if place is not None:
+                return place
+
+        candidates = [p for p in self.prefix(key) if self.qualifies(p, qualifier)]
+        if candidates:
+            return candidates[0]
+
+        ids, _ = self.fuzzy(key)
+        return self.best(ids, qualifier)
+
+
+class CachedGeocoder:
+    """Gazetteer-first geocoding with a persistent cache in front of a live geocoder.
+
+    Lookups are answered from the local gazetteer when possible; otherwise
+    from the cache (including remembered misses), and only then from the
+    live geocoder, if one is configured.
+    """
+
+    def __init__(self, gazetteer, cache, live_geocoder=None):
+        self.gazetteer = gazetteer
+        self.cache = cache
+        self.live_geocoder = live_geocoder
+        self.counters = {'gazetteer': 0, 'cache': 0, 'live': 0, 'not_found': 0}
+
+    def geocode(self, query):
+        """Return {'name', 'latitude', 'longitude', 'source'} or None"""
+        place = self.gazetteer.lookup(query)
+        if place is not None:
+            self.counters['gazetteer'] += 1
+            return {
+                'name': ', '.join(p for p in (place['name'], place.get('admin'), place.get('country')) if p),
+                'latitude': place['latitude'],
+                'longitude': place['longitude'],
+                'source': 'gazetteer',
+            }
+
+        key = normalize_place(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters['cache'] += 1
+            return dict(cached, source='cache') if cached.get('latitude') is not None else None
+
+        if self.live_geocoder is None:
+            self.counters['not_found'] += 1
+            return None
+
+        location = self.live_geocoder.geocode(query)
+        self.counters['live'] += 1
+        result = {'name': location.address, 'latitude': location.latitude, 'longitude': location.longitude} \
+            if location is not None else {'name': None, 'latitude': None, 'longitude': None}
+        # Misses are cached too so unknown names don't hit the network every time
+        self.cache.set(key, result)
+        return dict(result, source='live') if location is not None else None
+
+    def stats(self):
+        return dict(self.counters, places=len(self.gazetteer))
@@ -0,0 +1,100 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat, lng, latitudes, longitudes):
+    """Vectorized great-circle distance from one point to many"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlng = np.radians(longitudes) - np.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """Fixed-size lat/lng grid over the catalog rows.
+
+    Rows are sorted by cell key (row-major over latitude bands), so all the
+    cells of one latitude band that a query touches form a single contiguous
+    slice of the permutation. A query is then a few bisects per band plus a
+    vectorized haversine refinement of the candidates.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_degrees=0.05):
+        self.cell_degrees = cell_degrees
+        self.columns = int(np.ceil(360.0 / cell_degrees))
+        self.bands = int(np.ceil(180.0 / cell_degrees))
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+
+        keys = self.band_of(latitudes) * self.columns + self.column_of(longitudes)
+        self.order = np.argsort(keys, kind='stable').astype(np.int64)
+        self.sorted_keys = keys[self.order]
+
+    def band_of(self, latitudes):
+        bands = np.floor((np.asarray(latitudes, dtype=np.float64) + 90.0) / self.cell_degrees).astype(np.int64)
+        return np.clip(bands, 0, self.bands - 1)
+
+    def column_of(self, longitudes):
+        columns = np.floor((np.asarray(longitudes, dtype=np.float64) + 180.0) / self.cell_degrees).astype(np.int64)
+        return np.clip(columns, 0, self.columns - 1)
+
+    def column_spans(self, west, east):
+        """Column ranges for a longitude span, split at the antimeridian"""
+        if east - west >= 360.0:
+            return [(0, self.columns - 1)]
+        west = (west + 180.0) % 360.0 - 180.0
+        east = (east + 180.0) % 360.0 - 180.0
+        first, last = int(self.column_of(west)), int(self.column_of(east))
+        if west <= east:
+            return [(first, last)]
+        return [(first, self.columns - 1), (0, last)]
+
+    def cells(self, south, west, north, east):
+        """Row ids in every grid cell overlapping the box"""
+        first_band, last_band = int(self.band_of(south)), int(self.band_of(north))
+        spans = self.column_spans(west, east)
+        slices = []
+        for band in range(first_band, last_band + 1):
+            for first, last in spans:
+                low = band * self.columns + first
+                high = band * self.columns + last
+                start = np.searchsorted(self.sorted_keys, low, side='left')
+                stop = np.searchsorted(self.sorted_keys, high, side='right')
+                if stop > start:
+                    slices.append(self.order[start:stop])
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def within_bbox(self, south, west, north, east):
+        """Return the sorted row ids inside a bounding box"""
+        rows = self.cells(south, west, north, east)
+        lat = self.latitudes[rows]
+        lng = self.longitudes[rows]
+        inside = (lat >= south) & (lat <= north)
+        if west <= east:
+            inside &= (lng >= west) & (lng <= east)
+        else:
+            inside &= (lng >= west) | (lng <= east)
+        return np.sort(rows[inside])
+
+    def within_radius(self, lat, lng, radius_km):
+        """Return (row ids, distances in km) within radius, nearest first"""
+        # Bounding box of the spherical cap; it spans every longitude if it covers a pole
+        angular = radius_km / EARTH_RADIUS_KM
+        lat_rad = np.radians(lat)
+        south, north = np.degrees(lat_rad - angular), np.degrees(lat_rad + angular)
+        if south <= -90.0 or north >= 90.0 or angular >= np.pi / 2:
+            south, north, lng_span = max(south, -90.0), min(north, 90.0), 360.0
+        else:
+            lng_span = np.degrees(np.arcsin(min(np.sin(angular) / np.cos(lat_rad), 1.0)))
+
+        rows = self.cells(south, lng - lng_span, north, lng + lng_span)
+        distances = haversine_km(lat, lng, self.latitudes[rows], self.longitudes[rows])
+        inside = distances <= radius_km
+        rows, distances = rows[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
@@ -0,0 +1,81 @@
+import gzip
+import hashlib
+import json
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bodies smaller than this aren't worth the gzip CPU (and often grow)
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/csv'}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it is installed.
+
+    Output matches the default provider (sorted keys, Flask's handling of
+    dates, decimals and dataclasses via default()); without orjson, or for
+    calls with json.dumps keyword arguments, it is the default provider.
+    """
+
+    def orjson_options(self):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.orjson_options()).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def request_etag(version, body, *extra):
+    """Weak ETag for a read-only request: data version, route and the normalized JSON body"""
+    key = json.dumps([version, request.path, body, extra], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:32]
+
+
+def not_modified(etag):
+    """A 304 response when the client's If-None-Match already has etag, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(current_app.response_class(status=304), etag)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    # Clients may reuse the body but must revalidate it every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def gzip_response(response, min_bytes=GZIP_MIN_BYTES):
+    """Gzip a buffered text/JSON response when the client accepts it (an after_request hook)"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from keyword_matcher import TravelQueryMatcher
+from llm_cache import normalize_cache_text
+
+
+class IntentLog:
+    """SQLite log of LLM intent parses, the training set for LocalIntentModel"""
+
+    def __init__(self, db_path='intent_log.db'):
+        self.db_path = db_path
+        self.init_database()
+
+    def init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS intent_log (
+                    query TEXT PRIMARY KEY,
+                    intent TEXT NOT NULL,
+                    logged_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, query, intent):
+        """Store the LLM parse for query (the latest parse of a query wins)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('INSERT OR REPLACE INTO intent_log (query, intent, logged_at) VALUES (?, ?, ?)',
+                         (normalize_cache_text(query), json.dumps(intent), time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def examples(self):
+        """Return (queries, intents) for every logged parse"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT query, intent FROM intent_log ORDER BY logged_at').fetchall()
+        finally:
+            conn.close()
+        return [query for query, _ in rows], [json.loads(intent) for _, intent in rows]
+
+    def __len__(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM intent_log').fetchone()[0]
+        finally:
+            conn.close()
+
+
+class LocalIntentModel:
+    """In-process intent parser: TF-IDF features + one linear classifier per activity.
+
+    Activity labels are learned from logged LLM parses; budget, group size
+    and dates come from the keyword matcher's extractors. Each prediction
+    carries a confidence, the least certain of the per-activity decisions,
+    so callers can escalate doubtful queries to the LLM.
+    """
+
+    def __init__(self, activities_keywords):
+        self.matcher = TravelQueryMatcher(activities_keywords)
+        self.categories = list(activities_keywords)
+        self.vectorizer = None
+        self.classifiers = {}
+        self.constant = {}
+        self.examples = 0
+
+    def labels(self, intent):
+        """Map an LLM parse's free-text activities onto the known categories"""
+        activities = intent.get('activities') if isinstance(intent, dict) else None
+        if isinstance(activities, str):
+            activities = [activities]
+        labels = set()
+        for activity in activities or []:
+            text = str(activity).lower()
+            if text in self.categories:
+                labels.add(text)
+            else:
+                labels.update(self.matcher.parse(text)['activities'])
+        return labels
+
+    def fit(self, queries, intents):
+        label_sets = [self.labels(intent) for intent in intents]
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1)
+        features = self.vectorizer.fit_transform(normalize_cache_text(q) for q in queries)
+
+        self.classifiers, self.constant = {}, {}
+        for category in self.categories:
+            target = np.array([category in labels for labels in label_sets])
+            if target.all() or not target.any():
+                # Nothing to learn from a label that never (or always) appears
+                self.constant[category] = bool(target.any())
+                continue
+            classifier = LogisticRegression(C=4.0, class_weight='balanced', max_iter=1000)
+            self.classifiers[category] = classifier.fit(features, target)
+        self.examples = len(queries)
+        return self
+
+    @property
+    def trained(self):
+        return self.vectorizer is not None
+
+    def predict(self, query):
+        """Return (activities, confidence) for one query"""
+        features = self.vectorizer.transform([normalize_cache_text(query)])
+        activities, confidence = [], 1.0
+        for category in self.categories:
+            if category in self.classifiers:
+                probability = self.classifiers[category].predict_proba(features)[0, 1]
+                confidence = min(confidence, max(probability, 1.0 - probability))
+                if probability >= 0.5:
+                    activities.append(category)
+            elif self.constant.get(category):
+                activities.append(category)
+        return activities, confidence
+
+    def parse(self, query):
+        """Return the intent dict for query plus the activity confidence"""
+        activities, confidence = self.predict(query)
+        intent = self.matcher.parse(query)
+        intent['activities'] = activities
+        return intent, confidence
+
+    def save(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+class LocalIntentParser:
+    """Answer confidently classified queries locally and escalate the rest.
+
+    parse() returns the local model's intent when its confidence clears the
+    threshold, otherwise None so the caller asks the LLM; LLM answers are
+    fed back through record() and the model is retrained in the background
+    every retrain_every new examples.
+    """
+
+    def __init__(self, activities_keywords, log, model=None, threshold=0.85,
+                 min_examples=50, retrain_every=200):
+        self.activities_keywords = activities_keywords
+        self.log = log
+        self.model = model
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self.retrain_every = retrain_every
+        self.lock = threading.Lock()
+        self.training = False
+        self.pending = 0
+        self.counters = {'local': 0, 'escalated': 0, 'logged': 0, 'retrains': 0}
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def parse(self, query):
+        """Return a local intent dict, or None when the query should go to the LLM"""
+        model = self.model
+        if model is not None and model.trained:
+            intent, confidence = model.parse(query)
+            if confidence >= self.threshold:
+                self.count('local')
+                intent['source'] = 'local_model'
+                intent['confidence'] = round(float(confidence), 4)
+                return intent
+        self.count('escalated')
+        return None
+
+    def record(self, query, intent):
+        """Log an LLM parse as a training example"""
+        if not isinstance(intent, dict):
+            return
+        self.log.record(query, intent)
+        self.count('logged')
+        with self.lock:
+            self.pending += 1
+            due = not self.training and (
+                self.pending >= self.retrain_every or (self.model is None and self.pending >= self.min_examples)
+            )
+            if due:
+                self.training = True
+        if due:
+            threading.Thread(target=self.retrain, name='intent-retrain', daemon=True).start()
+
+    def retrain(self):
+        """Fit a fresh model on the whole log and swap it in"""
+        try:
+            # Examples recorded once training has started stay pending for the next run
+            with self.lock:
+                trained = self.pending
+            queries, intents = self.log.examples()
+            if len(queries) < self.min_examples:
+                return self.model
+            model = LocalIntentModel(self.activities_keywords).fit(queries, intents)
+            with self.lock:
+                self.model = model
+                self.pending -= trained
+                self.counters['retrains'] += 1
+            return model
+        finally:
+            with self.lock:
+                self.training = False
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        parsed = stats['local'] + stats['escalated']
+        stats['escalation_rate'] = round(stats['escalated'] / parsed, 4) if parsed else 0.0
+        stats['threshold'] = self.threshold
+        stats['trained_examples'] = self.model.examples if self.model is not None else 0
+        return stats
+
+
+if __name__ == '__main__':
+    from app import AITravelAgent
+
+    parser = argparse.ArgumentParser(description='Train the local intent model from logged LLM parses')
+    parser.add_argument('--log', default='intent_log.db', help='Intent log SQLite database')
+    parser.add_argument('--output', default='intent_model.pkl')
+    parser.add_argument('--threshold', type=float, default=0.85,
+                        help='Report how many logged queries clear this confidence')
+    args = parser.parse_args()
+
+    queries, intents = IntentLog(args.log).examples()
+    model = LocalIntentModel(AITravelAgent().activities_keywords).fit(queries, intents)
+    model.save(args.output)
+    confident = sum(model.predict(query)[1] >= args.threshold for query in queries)
+    print(f"Trained on {len(queries):,} parses; {confident:,} would be answered locally at {args.threshold}")
@@ -0,0 +1,77 @@
+import json
+
+
+class JSONArrayStreamParser:
+    """Incrementally extract complete objects from a streamed JSON array.
+
+    Text is fed in arbitrary chunks (e.g. LLM completion deltas). Anything
+    before the opening '[' is skipped, and each top-level object is decoded
+    and returned as soon as its closing brace arrives, without waiting for
+    the rest of the array. Until the first object arrives, a ``` fence
+    restarts the search for the array, and a bracketed aside that closes
+    without objects (e.g. "[sorted by season]") is ignored.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current = None
+        self.backticks = 0
+        self.count = 0
+
+    def restart(self):
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current = None
+
+    def feed(self, text):
+        """Consume a chunk of text and return the objects it completed"""
+        objects = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.in_string:
+                self.backticks = self.backticks + 1 if char == '`' else 0
+                if self.backticks == 3 and self.count == 0:
+                    # The answer proper starts after a code fence, whatever came before it
+                    self.restart()
+                    continue
+            if not self.started:
+                self.started = char == '['
+                continue
+
+            if self.current is not None:
+                self.current.append(char)
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.current = [char]
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0 and char == ']':
+                    if self.count:
+                        self.finished = True
+                    else:
+                        # Brackets in the preamble, not the answer: keep looking
+                        self.restart()
+                    continue
+                self.depth -= 1
+                if self.depth == 0 and self.current is not None:
+                    objects.append(json.loads(''.join(self.current)))
+                    self.current = None
+                    self.count += 1
+        return objects
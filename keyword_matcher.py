@@ -0,0 +1,199 @@
+import re
+from collections import deque
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+}
+NUMBER = r'(\d[\d,]*(?:\.\d+)?|' + '|'.join(NUMBER_WORDS) + r')'
+
+# Anchored parsers run at the position of a trigger keyword
+AMOUNT_AFTER = re.compile(r'(?:\s*(?:of|is|around|about|under|below|max|up to|:))*\s*[$€£]?\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?')
+AMOUNT_BEFORE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k)?\s*$')
+COUNT_BEFORE = re.compile(NUMBER + r'\s+(?:\w+\s+)?$')
+COUNT_AFTER = re.compile(r'\s*' + NUMBER + r'\b')
+DAY_AFTER = re.compile(r'\s+(\d{1,2})(?:st|nd|rd|th)?\b')
+DAY_BEFORE = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?$')
+
+BUDGET_PREFIXES = ['$', '€', '£', 'budget']
+BUDGET_SUFFIXES = ['dollars', 'dollar', 'usd', 'bucks', 'eur', 'euros']
+PEOPLE_NOUNS = ['people', 'persons', 'adults', 'travelers', 'travellers', 'guests', 'friends',
+                'kids', 'children', 'of us']
+GROUP_PREFIXES = ['family of', 'group of', 'party of']
+GROUP_WORDS = {'solo': 1, 'alone': 1, 'by myself': 1, 'couple': 2, 'honeymoon': 2, 'my partner': 2}
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+          'september', 'october', 'november', 'december']
+# Months that are also common words only count next to a day or after "in"-style cues
+AMBIGUOUS_MONTHS = {'may'}
+MONTH_CUES = ('in ', 'of ', 'early ', 'mid ', 'late ', 'during ')
+MONTH_ABBREVIATIONS = ['jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec']
+DATE_PHRASES = ['next week', 'next month', 'this weekend', 'next weekend', 'this summer', 'this winter',
+                'summer', 'winter', 'spring', 'fall', 'autumn', 'christmas', 'new year', 'thanksgiving',
+                'tomorrow', 'tonight']
+
+
+def parse_number(text):
+    text = text.replace(',', '')
+    return NUMBER_WORDS[text] if text in NUMBER_WORDS else float(text)
+
+
+def parse_amount(match):
+    amount = parse_number(match.group(1))
+    return amount * 1000 if match.group(2) else amount
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton: find every occurrence of many patterns in one pass"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+
+    def add(self, pattern, payload):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append((len(pattern), payload))
+
+    def build(self):
+        """Compute failure links breadth-first and merge suffix outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+        return self
+
+    def search(self, text):
+        """Yield (start, end, payload) for every pattern occurrence"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in outputs[state]:
+                yield end - length, end, payload
+
+
+class TravelQueryMatcher:
+    """Compiled keyword table for AITravelAgent.fallback_parse.
+
+    Activity keywords, budget / group-size triggers and date expressions are
+    all compiled into one Aho-Corasick automaton, so a single pass over the
+    query finds every category and trigger no matter how large the
+    vocabulary grows. Triggers then parse their number with a short anchored
+    regex at the match position. Activity keywords keep the previous
+    substring semantics; triggers must fall on word boundaries.
+    """
+
+    def __init__(self, activities_keywords):
+        self.categories = list(activities_keywords)
+        self.automaton = AhoCorasick()
+        for order, (activity, keywords) in enumerate(activities_keywords.items()):
+            for keyword in keywords:
+                self.automaton.add(keyword.lower(), ('activity', order))
+        for trigger in BUDGET_PREFIXES:
+            self.automaton.add(trigger, ('budget_prefix', None))
+        for trigger in BUDGET_SUFFIXES:
+            self.automaton.add(trigger, ('budget_suffix', None))
+        for noun in PEOPLE_NOUNS:
+            self.automaton.add(noun, ('people', noun))
+        for trigger in GROUP_PREFIXES:
+            self.automaton.add(trigger, ('group_prefix', None))
+        for word, size in GROUP_WORDS.items():
+            self.automaton.add(word, ('group_word', size))
+        for month in MONTHS + MONTH_ABBREVIATIONS:
+            self.automaton.add(month, ('month', month))
+        for phrase in DATE_PHRASES:
+            self.automaton.add(phrase, ('date', phrase))
+        self.automaton.build()
+
+    def is_word(self, text, start, end):
+        # Symbols like '$' stand alone; words need non-alphanumeric neighbours
+        before = start == 0 or not text[start - 1].isalnum() or not text[start].isalnum()
+        after = end == len(text) or not text[end].isalnum() or not text[end - 1].isalnum()
+        return before and after
+
+    def parse(self, query):
+        """Return the fallback intent dict for query in one automaton pass"""
+        text = query.lower()
+        activities = set()
+        budget = None
+        people = {}
+        group_total = None
+        group_hint = None
+        dates = []
+        covered = -1
+
+        for start, end, (kind, value) in self.automaton.search(text):
+            if kind == 'activity':
+                activities.add(value)
+                continue
+            if not self.is_word(text, start, end):
+                continue
+
+            if kind == 'budget_prefix' and budget is None:
+                match = AMOUNT_AFTER.match(text, end)
+                if match:
+                    budget = parse_amount(match)
+            elif kind == 'budget_suffix' and budget is None:
+                match = AMOUNT_BEFORE.search(text, 0, start)
+                if match:
+                    budget = parse_amount(match)
+            elif kind == 'people':
+                match = COUNT_BEFORE.search(text[max(0, start - 24):start])
+                if match:
+                    people.setdefault(value, parse_number(match.group(1)))
+            elif kind == 'group_prefix' and group_total is None:
+                match = COUNT_AFTER.match(text, end)
+                if match:
+                    group_total = parse_number(match.group(1))
+            elif kind == 'group_word' and group_hint is None:
+                group_hint = value
+            elif kind in ('month', 'date') and start >= covered:
+                # start < covered means a phrase nested in one already taken ("summer" in "this summer")
+                expression = text[start:end]
+                if kind == 'month':
+                    day = DAY_AFTER.match(text, end)
+                    if day:
+                        expression, end = f'{expression} {day.group(1)}', day.end()
+                    else:
+                        day = DAY_BEFORE.search(text[max(0, start - 12):start])
+                        if day:
+                            expression = f'{day.group(1)} {expression}'
+                        elif value in AMBIGUOUS_MONTHS and not text[:start].endswith(MONTH_CUES):
+                            continue
+                dates.append(expression)
+                covered = end
+
+        if group_total is not None:
+            # "family of 4 with 2 kids": the stated total already includes the kids
+            group_size = int(group_total)
+        elif people:
+            group_size = int(sum(people.values()))
+        elif group_hint is not None:
+            group_size = int(group_hint)
+        else:
+            group_size = 1
+
+        return {
+            'activities': [self.categories[order] for order in sorted(activities)],
+            'location': None,
+            'budget': budget,
+            'dates': dates or None,
+            'group_size': group_size
+        }
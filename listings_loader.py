@@ -0,0 +1,203 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog import CatalogBuilder
+
+# Inside Airbnb listings.csv columns the search schema is built from
+LISTING_COLUMNS = [
+    'id', 'name', 'description', 'host_id', 'neighbourhood_cleansed',
+    'latitude', 'longitude', 'room_type', 'accommodates', 'bathrooms',
+    'bathrooms_text', 'bedrooms', 'amenities', 'price', 'number_of_reviews',
+    'review_scores_rating',
+]
+
+# Text hints used to tag listings with the activities the search understands
+ACTIVITY_HINTS = {
+    'whales': ['whale', 'harbor', 'harbour', 'marina', 'sea view'],
+    'beaches': ['beach', 'oceanfront', 'waterfront', 'surf'],
+    'mountains': ['mountain', 'hiking', 'ski', 'cabin', 'trail'],
+    'culture': ['museum', 'historic', 'gallery', 'theater', 'theatre'],
+    'food': ['restaurant', 'cafe', 'foodie', 'dining', 'market'],
+    'nightlife': ['nightlife', 'bars', 'club', 'downtown'],
+}
+
+
+def parse_prices(series):
+    """Convert '$1,234.00' style strings to floats (NaN when missing)"""
+    cleaned = series.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def parse_amenities(value):
+    """Decode the JSON-encoded amenities list of a listing"""
+    if not isinstance(value, str) or not value:
+        return []
+    try:
+        amenities = json.loads(value)
+    except ValueError:
+        # Older dumps use a Postgres array literal: {Wifi,"Air conditioning"}
+        amenities = [a.strip().strip('"') for a in value.strip('{}').split(',')]
+    return [a for a in amenities if isinstance(a, str) and a]
+
+
+def parse_ratings(series):
+    """Normalize review scores to a 0-5 scale (older dumps use 0-100)"""
+    ratings = pd.to_numeric(series, errors='coerce')
+    return ratings.where(ratings <= 5, ratings / 20).round(1)
+
+
+def parse_bathrooms(frame):
+    """Prefer the numeric bathrooms column, falling back to '1.5 baths' text"""
+    bathrooms = pd.Series(np.nan, index=frame.index)
+    if 'bathrooms' in frame:
+        bathrooms = pd.to_numeric(frame['bathrooms'], errors='coerce')
+    if 'bathrooms_text' in frame:
+        text = frame['bathrooms_text'].astype('string').str.lower()
+        from_text = pd.to_numeric(text.str.extract(r'(\d+(?:\.\d+)?)')[0], errors='coerce')
+        from_text = from_text.mask(from_text.isna() & text.str.contains('half', na=False), 0.5)
+        bathrooms = bathrooms.fillna(from_text)
+    return bathrooms.fillna(0)
+
+
+def tag_activities(frame, amenities):
+    """Tag each listing with activities hinted at by its name, description and amenities"""
+    text = frame['name'].fillna('').astype(str).str.lower()
+    if 'description' in frame:
+        text = text + ' ' + frame['description'].fillna('').astype(str).str.lower()
+    text = text + ' ' + pd.Series([' '.join(a).lower() for a in amenities], index=frame.index)
+
+    tags = [[] for _ in range(len(frame))]
+    for activity, hints in ACTIVITY_HINTS.items():
+        pattern = '|'.join(hints)
+        for row in np.flatnonzero(text.str.contains(pattern, regex=True).to_numpy()):
+            tags[row].append(activity)
+    return tags
+
+
+class ListingsLoader:
+    """Stream an Inside Airbnb listings.csv(.gz) dump into a PropertyCatalog.
+
+    The file is read in fixed-size chunks of only the columns we need, each
+    chunk is type-coerced with vectorized pandas ops, mapped to the search
+    schema and appended to a CatalogBuilder, so peak memory is one chunk
+    plus the compact catalog rather than the whole dump.
+    """
+
+    def __init__(self, path, city=None, country=None, chunksize=50000, progress=None):
+        self.path = path
+        self.city = city
+        self.country = country
+        self.chunksize = chunksize
+        self.progress = progress if progress is not None else self.print_progress
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def print_progress(self, loader):
+        print(f"{loader.path}: {loader.rows_read:,} rows read, {loader.rows_loaded:,} loaded "
+              f"({loader.rows_per_sec:,.0f} rows/sec)", file=sys.stderr)
+
+    def iter_chunks(self):
+        return pd.read_csv(
+            self.path,
+            usecols=lambda column: column in LISTING_COLUMNS,
+            dtype=str,
+            chunksize=self.chunksize,
+            compression='infer',
+            keep_default_na=True,
+        )
+
+    def map_chunk(self, frame):
+        """Map one raw chunk to (property dicts, numeric columns)"""
+        price = parse_prices(frame['price'])
+        latitude = pd.to_numeric(frame['latitude'], errors='coerce')
+        longitude = pd.to_numeric(frame['longitude'], errors='coerce')
+
+        # Listings without a price or a location can't be searched
+        valid = price.notna() & latitude.notna() & longitude.notna()
+        frame = frame[valid]
+        if frame.empty:
+            return [], None
+
+        price = price[valid]
+        latitude = latitude[valid]
+        longitude = longitude[valid]
+        rating = parse_ratings(frame['review_scores_rating']).fillna(0.0)
+        accommodates = pd.to_numeric(frame['accommodates'], errors='coerce').fillna(1).astype(np.int32)
+        bedrooms = pd.to_numeric(frame['bedrooms'], errors='coerce').fillna(0).astype(np.int32)
+        bathrooms = parse_bathrooms(frame)
+        reviews = pd.to_numeric(frame['number_of_reviews'], errors='coerce').fillna(0).astype(np.int64)
+        amenities = [parse_amenities(value) for value in frame['amenities']]
+        activities = tag_activities(frame, amenities)
+        cities = [self.city] * len(frame) if self.city else frame['neighbourhood_cleansed'].fillna('').tolist()
+
+        properties = [
+            {
+                'id': str(listing_id),
+                'name': name if isinstance(name, str) else '',
+                'city': city,
+                'country': self.country,
+                'latitude': float(lat),
+                'longitude': float(lng),
+                'price': float(p),
+                'room_type': room_type if isinstance(room_type, str) else '',
+                'accommodates': int(acc),
+                'bedrooms': int(beds),
+                'bathrooms': float(baths),
+                'rating': float(r),
+                'reviews': int(n),
+                'host_id': str(host_id),
+                'safety_score': None,
+                'amenities': listing_amenities,
+                'activities': listing_activities,
+            }
+            for listing_id, name, city, lat, lng, p, room_type, acc, beds, baths, r, n, host_id,
+                listing_amenities, listing_activities in zip(
+                frame['id'], frame['name'], cities, latitude, longitude, price, frame['room_type'],
+                accommodates, bedrooms, bathrooms, rating, reviews, frame['host_id'], amenities, activities)
+        ]
+        columns = {
+            'price': price.to_numpy(np.float64),
+            'rating': rating.to_numpy(np.float64),
+            'accommodates': accommodates.to_numpy(np.int32),
+            'bedrooms': bedrooms.to_numpy(np.int32),
+            'latitude': latitude.to_numpy(np.float64),
+            'longitude': longitude.to_numpy(np.float64),
+        }
+        return properties, columns
+
+    def load(self, builder=None):
+        """Load the dump into builder (a new CatalogBuilder by default) and build it"""
+        builder = builder if builder is not None else CatalogBuilder()
+        started = time.perf_counter()
+        for frame in self.iter_chunks():
+            properties, columns = self.map_chunk(frame)
+            if properties:
+                builder.add_chunk(properties, columns)
+            self.rows_read += len(frame)
+            self.rows_loaded += len(properties)
+            self.elapsed = time.perf_counter() - started
+            self.progress(self)
+        return builder.build()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load an Inside Airbnb listings dump into the search catalog')
+    parser.add_argument('path', help='Path to listings.csv or listings.csv.gz')
+    parser.add_argument('--city', help='City name to assign to every listing (default: neighbourhood)')
+    parser.add_argument('--country', help='Country name to assign to every listing')
+    parser.add_argument('--chunksize', type=int, default=50000)
+    args = parser.parse_args()
+
+    loader = ListingsLoader(args.path, city=args.city, country=args.country, chunksize=args.chunksize)
+    catalog = loader.load()
+    print(f"Loaded {len(catalog):,} listings in {loader.elapsed:.1f}s ({loader.rows_per_sec:,.0f} rows/sec)")
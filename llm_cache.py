@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_cache_text(text):
+    """Normalize free text so trivially different inputs share a cache key"""
+    return ' '.join(str(text).casefold().split())
+
+
+class ResponseCache:
+    """Two-tier cache for expensive upstream responses.
+
+    Tier 1 is an in-process LRU (OrderedDict) so repeat lookups never leave
+    the process; tier 2 is a local SQLite table shared by every worker and
+    restart. Both tiers honor the same TTL. Values must be JSON-serializable.
+    """
+
+    def __init__(self, db_path='llm_cache.db', namespace='default', max_entries=1024,
+                 max_db_entries=100000, ttl_seconds=7 * 24 * 3600):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_db_entries = max_db_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self.init_database()
+
+    def init_database(self):
+        """Create the cache table if needed"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    namespace TEXT NOT NULL,
+                    cache_key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, cache_key)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache (namespace, accessed_at)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return value
+                del self.memory[key]
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM response_cache WHERE namespace = ? AND cache_key = ? AND expires_at > ?',
+                (self.namespace, key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute('UPDATE response_cache SET accessed_at = ? WHERE namespace = ? AND cache_key = ?',
+                             (now, self.namespace, key))
+                conn.commit()
+        finally:
+            conn.close()
+
+        if row is None:
+            self.count('misses')
+            return None
+        value = json.loads(row[0])
+        self.remember(key, value, row[1])
+        self.count('disk_hits')
+        return value
+
+    def remember(self, key, value, expires_at):
+        """Put an entry in the in-process LRU tier"""
+        with self.lock:
+            self.memory[key] = (value, expires_at)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def set(self, key, value):
+        """Store value in both tiers"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self.remember(key, value, expires_at)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO response_cache (namespace, cache_key, value, expires_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (self.namespace, key, json.dumps(value), expires_at, now))
+            evicted = self.evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+        self.count('writes')
+        if evicted:
+            self.count('evictions', evicted)
+
+    def evict(self, conn, now):
+        """Drop expired rows and trim the table to max_db_entries (least recently used first)"""
+        evicted = conn.execute('DELETE FROM response_cache WHERE namespace = ? AND expires_at <= ?',
+                               (self.namespace, now)).rowcount
+        size = conn.execute('SELECT COUNT(*) FROM response_cache WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+        if size > self.max_db_entries:
+            evicted += conn.execute('''
+                DELETE FROM response_cache WHERE namespace = ? AND cache_key IN (
+                    SELECT cache_key FROM response_cache WHERE namespace = ?
+                    ORDER BY accessed_at ASC LIMIT ?
+                )
+            ''', (self.namespace, self.namespace, size - self.max_db_entries)).rowcount
+        return evicted
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('DELETE FROM response_cache WHERE namespace = ?', (self.namespace,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self.memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
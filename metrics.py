@@ -0,0 +1,248 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+
+# Seconds; Prometheus buckets are cumulative upper bounds (value <= le)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label-value tuple"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.label_names, labels)} {format_value(value)}'
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. requests in flight)"""
+
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram per label-value tuple.
+
+    observe() is one bisect plus a few list updates under a lock, so it
+    costs about a microsecond; buckets are only made cumulative when the
+    histogram is rendered.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then the sum
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(labels, time.perf_counter() - start)
+
+    def samples(self):
+        with self.lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self.series.items()}
+        bounds = [format_value(float(bound)) for bound in self.buckets] + ['+Inf']
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{format_labels(self.label_names, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.label_names, labels)} {total!r}'
+            yield f'{self.name}_count{format_labels(self.label_names, labels)} {cumulative}'
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Besides the metrics it owns, collectors (callables returning
+    (name, kind, help, label_names, {label values: value})) are evaluated
+    at scrape time, so components that already keep counters are exported
+    without paying anything per request.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def collector(self, collect):
+        self.collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        for collect in self.collectors:
+            for name, kind, help_text, label_names, values in collect():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(values.items()):
+                    lines.append(f'{name}{format_labels(label_names, labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class UpstreamMetrics:
+    """Latency and error counts of outbound calls (OpenAI, translation, geocoding), by service"""
+
+    def __init__(self, registry):
+        self.latency = registry.histogram('upstream_request_duration_seconds',
+                                          'Time spent in outbound calls, by service', ('service',))
+        self.errors = registry.counter('upstream_errors_total', 'Outbound calls that raised, by service',
+                                       ('service',))
+
+    @contextmanager
+    def time(self, service):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.inc((service,))
+            raise
+        finally:
+            self.latency.observe((service,), time.perf_counter() - start)
+
+    def wrap(self, client, service, methods):
+        return TimedClient(client, service, methods, self)
+
+
+class TimedClient:
+    """Outbound client wrapper: calls to the given methods are timed under service"""
+
+    def __init__(self, client, service, methods, upstream):
+        self.client = client
+        self.service = service
+        self.methods = set(methods)
+        self.upstream = upstream
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if name not in self.methods:
+            return attribute
+
+        def timed(*args, **kwargs):
+            with self.upstream.time(self.service):
+                return attribute(*args, **kwargs)
+        return timed
+
+
+class RequestMetrics:
+    """Per-route latency, status and in-flight metrics for a Flask app.
+
+    Timing and status are recorded by WSGI middleware on the raw environ;
+    a single before_request hook only labels the request with its route
+    (the request proxy is comparatively slow, so it is touched once).
+    A request is recorded once the app returns its response, which for
+    streamed (SSE) responses is when the headers go out, not the last chunk.
+    """
+
+    def __init__(self, registry):
+        self.latency = registry.histogram('http_request_duration_seconds',
+                                          'Time spent handling a request, by route', ('method', 'route'))
+        self.responses = registry.counter('http_requests_total', 'Requests handled, by route and status',
+                                          ('method', 'route', 'status'))
+        self.in_flight = registry.gauge('http_requests_in_flight', 'Requests being handled, by route', ('route',))
+        self.wsgi_app = None
+
+    def install(self, app):
+        app.before_request(self.before_request)
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+
+    def before_request(self):
+        current = request._get_current_object()
+        route = current.url_rule.rule if current.url_rule is not None else 'unmatched'
+        current.environ['metrics.route'] = route
+        self.in_flight.inc((route,))
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        status = []
+
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(status_line[:3])
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            route = environ.get('metrics.route')
+            labels = (environ['REQUEST_METHOD'], route or 'unmatched')
+            self.latency.observe(labels, time.perf_counter() - start)
+            # No status means the app raised, which the server turns into a 500
+            self.responses.inc(labels + (status[-1] if status else '500',))
+            if route is not None:
+                self.in_flight.dec((route,))
+
+        try:
+            return self.wsgi_app(environ, capture_status)
+        finally:
+            finish()
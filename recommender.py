@@ -0,0 +1,134 @@
+import numpy as np
+
+
+def activity_columns(catalog, activities):
+    """Catalog activity columns for a user's (deduplicated) activities"""
+    return [catalog.activity_index[a] for a in dict.fromkeys(activities) if a in catalog.activity_index]
+
+
+def score_properties(catalog, preferences, out=None):
+    """Score every property for one user into a per-request buffer.
+
+    score = 2 * shared activities + 1 if within budget + rating
+    """
+    scores = out if out is not None else np.empty(len(catalog), dtype=np.float64)
+    scores[:] = 0.0
+
+    # Score based on activities
+    if preferences.get('activities'):
+        columns = activity_columns(catalog, preferences['activities'])
+        if columns:
+            np.sum(catalog.activity_matrix[:, columns], axis=1, out=scores)
+            scores *= 2
+
+    # Score based on price preference
+    if preferences.get('budget'):
+        scores += catalog.price <= preferences['budget']
+
+    # Score based on rating
+    scores += catalog.rating
+    return scores
+
+
+def top_k(scores, k):
+    """Row ids of the k best scores, best first, ties in catalog order.
+
+    Uses a partial selection for the k-th best score instead of sorting all
+    rows; only the selected rows are sorted.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    rows = np.concatenate([above, ties])
+    return rows[np.lexsort((rows, -scores[rows]))]
+
+
+def recommend(catalog, preferences, k=10):
+    """Return the top k properties for preferences, annotated with their score.
+
+    The shared catalog dicts are never modified; each result is a copy.
+    """
+    scores = score_properties(catalog, preferences)
+    rows = top_k(scores, k)
+    return [dict(p, recommendation_score=float(scores[row])) for p, row in zip(catalog.rows(rows), rows)]
+
+
+def encode_preferences(catalog, preferences_list):
+    """Encode users as a user x activity matrix plus a budget vector.
+
+    Users with identical effective preferences share one row; inverse maps
+    every input user to its row.
+    """
+    keys = {}
+    inverse = np.empty(len(preferences_list), dtype=np.int64)
+    for i, preferences in enumerate(preferences_list):
+        columns = activity_columns(catalog, preferences.get('activities') or [])
+        key = (frozenset(columns), preferences.get('budget') or None)
+        inverse[i] = keys.setdefault(key, len(keys))
+
+    users = np.zeros((len(keys), len(catalog.activities)), dtype=np.float32)
+    budgets = np.full(len(keys), np.nan)
+    for (columns, budget), row in keys.items():
+        users[row, list(columns)] = 1.0
+        if budget is not None:
+            budgets[row] = budget
+    return users, budgets, inverse
+
+
+def score_batch(catalog, users, budgets, property_activities=None):
+    """Score a block of users against every property in one matrix multiply.
+
+    property_activities is the activity x property float matrix; callers
+    scoring many blocks should build it once.
+    """
+    if property_activities is None:
+        property_activities = np.ascontiguousarray(catalog.activity_matrix.T, dtype=np.float32)
+    scores = (users @ property_activities).astype(np.float64)
+    scores *= 2
+    # NaN budgets never compare true, so users without a budget get no bonus
+    scores += catalog.price[None, :] <= budgets[:, None]
+    scores += catalog.rating[None, :]
+    return scores
+
+
+def top_k_batch(scores, k):
+    """Row-wise top_k: a (users, k) array of row ids with the same tie order"""
+    users, size = scores.shape
+    k = min(k, size)
+    if k <= 0:
+        return np.empty((users, 0), dtype=np.int64)
+    thresholds = np.partition(scores, size - k, axis=1)[:, size - k][:, None]
+    above_users, above_rows = np.nonzero(scores > thresholds)
+    tie_users, tie_rows = np.nonzero(scores == thresholds)
+
+    # Fill the remaining slots with the earliest tied rows, like top_k does
+    room = k - np.bincount(above_users, minlength=users)
+    tie_rank = np.arange(len(tie_users)) - np.searchsorted(tie_users, tie_users)
+    keep = tie_rank < room[tie_users]
+
+    user_ids = np.concatenate([above_users, tie_users[keep]])
+    rows = np.concatenate([above_rows, tie_rows[keep]])
+    order = np.lexsort((rows, -scores[user_ids, rows], user_ids))
+    return rows[order].reshape(users, k)
+
+
+def recommend_batch(catalog, preferences_list, k=10, max_cells=1 << 22):
+    """Top k properties for many users; results match recommend() per user.
+
+    Identical preferences are scored once, and users are scored in blocks
+    so the users x properties score matrix stays under max_cells entries.
+    """
+    users, budgets, inverse = encode_preferences(catalog, preferences_list)
+    property_activities = np.ascontiguousarray(catalog.activity_matrix.T, dtype=np.float32)
+    block = max(1, max_cells // max(len(catalog), 1))
+    results = []
+    for start in range(0, len(users), block):
+        scores = score_batch(catalog, users[start:start + block], budgets[start:start + block],
+                             property_activities)
+        for user_scores, rows in zip(scores, top_k_batch(scores, k)):
+            results.append([dict(p, recommendation_score=float(user_scores[row]))
+                            for p, row in zip(catalog.rows(rows), rows)])
+    return [results[row] for row in inverse]
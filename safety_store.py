@@ -0,0 +1,222 @@
+import csv
+import glob
+import json
+import os
+import random
+import threading
+import time
+
+from gazetteer import normalize_place
+
+DEFAULT_ADVISORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'advisories')
+SAFETY_LEVELS = ['Low Risk', 'Moderate Risk', 'High Risk', 'Very High Risk']
+MAX_PLACEHOLDERS = 10000
+DEFAULT_CONTACTS = {'police': '911', 'medical': '911', 'tourist_helpline': '+1-800-TRAVEL'}
+
+
+def split_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value or '').split('|') if item.strip()]
+
+
+def safety_level(level):
+    """Label for a numeric advisory level (1-4); ValueError outside that range, other labels pass through"""
+    if isinstance(level, (int, float)) or str(level).strip().lstrip('-').isdigit():
+        number = int(level)
+        if not 1 <= number <= len(SAFETY_LEVELS):
+            raise ValueError(f'Safety level {level} is outside 1..{len(SAFETY_LEVELS)}')
+        return SAFETY_LEVELS[number - 1]
+    return level
+
+
+def advisory_snapshot(record):
+    """Turn one advisory record (CSV row or JSON object) into a safety snapshot; ValueError if it is malformed"""
+    level = record.get('overall_safety')
+    if level in (None, ''):
+        level = record.get('level')
+    level = safety_level(level)
+    contacts = record.get('emergency_contacts') or {
+        field: record.get(field) or DEFAULT_CONTACTS[field] for field in DEFAULT_CONTACTS
+    }
+    crime_rate = record.get('crime_rate')
+    return {
+        'overall_safety': level or 'Unknown',
+        'crime_rate': float(crime_rate) if crime_rate not in (None, '') else None,
+        'health_advisory': record.get('health_advisory') or 'None',
+        'current_events': split_list(record.get('current_events')),
+        'emergency_contacts': contacts,
+        'updated_at': record.get('updated_at') or None,
+        'source': 'advisory'
+    }
+
+
+def read_advisories(path):
+    """Yield advisory records from a CSV file or a JSON list / {location: record} file"""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = [dict(record, location=location) if isinstance(record, dict) else record
+                    for location, record in data.items()]
+        yield from data
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def placeholder_snapshot(key):
+    """Stand-in snapshot for locations without an advisory, stable per location"""
+    rng = random.Random(key)
+    return {
+        'overall_safety': rng.choice(SAFETY_LEVELS),
+        'crime_rate': round(rng.uniform(1.0, 5.0), 1),
+        'health_advisory': rng.choice(['None', 'Vaccination recommended', 'Health precautions advised']),
+        'current_events': [
+            'Political stability maintained',
+            'Tourist areas well-monitored',
+            'Standard travel precautions recommended'
+        ],
+        'emergency_contacts': dict(DEFAULT_CONTACTS),
+        'updated_at': None,
+        'source': 'placeholder'
+    }
+
+
+class SafetyStore:
+    """In-memory safety snapshots keyed by normalized location.
+
+    Advisory files (*.csv / *.json with a location column plus level or
+    overall_safety, crime_rate, health_advisory, '|'-separated
+    current_events, police / medical / tourist_helpline and updated_at)
+    are loaded into a dict keyed by normalize_place(location), with aliases
+    indexed too. A background thread reloads the table when the files
+    change or the TTL expires, swapping it in atomically so readers never
+    wait on a reload. Lookups fall back from the exact location to its
+    country (via the "City, Country" suffix or the gazetteer), then to a
+    placeholder snapshot.
+    """
+
+    def __init__(self, advisory_dir=DEFAULT_ADVISORY_DIR, ttl_seconds=3600, refresh_interval=60, gazetteer=None):
+        self.advisory_dir = advisory_dir
+        self.ttl_seconds = ttl_seconds
+        self.refresh_interval = refresh_interval
+        self.gazetteer = gazetteer
+        self.table = {}
+        self.placeholders = {}
+        self.mtimes = {}
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+        self.pid = None
+        self.counters = {'hits': 0, 'country_hits': 0, 'placeholders': 0, 'reloads': 0, 'reload_errors': 0,
+                         'skipped_records': 0}
+        try:
+            self.load()
+        except Exception:
+            # Serve placeholders until the background refresh can read the files
+            self.counters['reload_errors'] += 1
+
+    def files(self):
+        return sorted(glob.glob(os.path.join(self.advisory_dir, '*.csv')) +
+                      glob.glob(os.path.join(self.advisory_dir, '*.json')))
+
+    def file_mtimes(self):
+        return {path: os.path.getmtime(path) for path in self.files()}
+
+    def load(self):
+        """Rebuild the table from the advisory files and swap it in"""
+        mtimes = self.file_mtimes()
+        table = {}
+        skipped = 0
+        for path in mtimes:
+            for record in read_advisories(path):
+                try:
+                    snapshot = dict(advisory_snapshot(record), location=record.get('location'))
+                except (AttributeError, TypeError, ValueError):
+                    # One bad row (e.g. crime_rate 'n/a', level 0) shouldn't take the whole file down
+                    skipped += 1
+                    continue
+                for name in [record.get('location')] + split_list(record.get('aliases')):
+                    key = normalize_place(name or '')
+                    if key:
+                        table[key] = snapshot
+        with self.lock:
+            self.table, self.mtimes, self.loaded_at = table, mtimes, time.time()
+            self.counters['reloads'] += 1
+            self.counters['skipped_records'] += skipped
+        return len(table)
+
+    def stale(self):
+        return time.time() - self.loaded_at >= self.ttl_seconds or self.file_mtimes() != self.mtimes
+
+    def start(self):
+        """Start the background refresh thread (once per process, so it survives forks)"""
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+
+        def refresh():
+            while True:
+                time.sleep(self.refresh_interval)
+                try:
+                    if self.stale():
+                        self.load()
+                except Exception:
+                    # Keep serving the previous table until the files are readable again
+                    with self.lock:
+                        self.counters['reload_errors'] += 1
+
+        threading.Thread(target=refresh, name='safety-refresh', daemon=True).start()
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def country_keys(self, location):
+        _, _, qualifier = str(location).rpartition(',')
+        if qualifier.strip():
+            yield normalize_place(qualifier)
+        if self.gazetteer is not None:
+            place = self.gazetteer.lookup(location)
+            if place is not None:
+                for field in ('admin', 'country'):
+                    if place.get(field):
+                        yield normalize_place(place[field])
+
+    def get(self, location):
+        """Return the safety snapshot for location"""
+        if self.pid != os.getpid():
+            self.start()
+        key = normalize_place(location)
+        table = self.table
+        snapshot = table.get(key)
+        if snapshot is not None:
+            self.count('hits')
+            return snapshot
+        for country_key in self.country_keys(location):
+            snapshot = table.get(country_key)
+            if snapshot is not None:
+                self.count('country_hits')
+                return snapshot
+
+        self.count('placeholders')
+        snapshot = self.placeholders.get(key)
+        if snapshot is None:
+            if len(self.placeholders) >= MAX_PLACEHOLDERS:
+                self.placeholders.clear()
+            snapshot = self.placeholders.setdefault(key, placeholder_snapshot(key))
+        return snapshot
+
+    def get_many(self, locations):
+        """Return snapshots for many locations in input order, resolving each distinct one once"""
+        resolved = {location: self.get(location) for location in dict.fromkeys(locations)}
+        return [resolved[location] for location in locations]
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['entries'] = len(self.table)
+        stats['files'] = len(self.mtimes)
+        stats['age_seconds'] = round(time.time() - self.loaded_at, 1)
+        return stats
@@ -0,0 +1,162 @@
+"""Pre-forking production entry point for app.py.
+
+The master process imports the app, builds the catalog and its indexes
+once, freezes everything it allocated out of the garbage collector and
+only then forks the workers, so they share those pages copy-on-write
+instead of each building (and dirtying) its own copy. Run from the
+repository root:
+
+    python serve.py --workers 4 --port 5000
+
+Every worker serves the shared listening socket with a threaded WSGI
+server; the master restarts workers that die and logs each worker's RSS
+and PSS (its share of the pages it maps). With gunicorn installed the
+same preload works as:
+
+    gunicorn --preload --workers 4 --bind 0.0.0.0:5000 'serve:preload()'
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import numpy as np
+from werkzeug.serving import make_server
+
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def preload():
+    """Import the app, build everything workers can share and freeze it; returns the WSGI app"""
+    import app as application
+
+    # Services are lazy by default; workers should inherit them built, not build them each
+    application.services.build_all()
+    catalog = application.airbnb_service.catalog
+    # Lazily built state is computed here once rather than once per worker
+    catalog.content_version()
+    for index in (catalog.indexes.price, catalog.indexes.rating):
+        index.positions(np.empty(0, dtype=np.int64))
+
+    # Objects that survive to the fork are never collected: with them frozen, a
+    # collection in a worker doesn't write GC bookkeeping into every shared page
+    gc.collect()
+    gc.freeze()
+    return application.app
+
+
+def process_memory(pid):
+    """Memory of a process in kB from /proc/<pid>/smaps_rollup (Linux), or {} if unavailable"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    memory = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in MEMORY_FIELDS:
+            memory[name] = int(value.split()[0])
+    return memory
+
+
+def memory_report(master_pid, worker_pids):
+    rows = [('master', master_pid)] + [(f'worker {i}', pid) for i, pid in enumerate(worker_pids, 1)]
+    lines = [f"{'process':>10} {'pid':>8} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}"]
+    total_rss = total_pss = 0
+    for name, pid in rows:
+        memory = process_memory(pid)
+        if not memory:
+            continue
+        shared = memory['Shared_Clean'] + memory['Shared_Dirty']
+        private = memory['Private_Clean'] + memory['Private_Dirty']
+        total_rss += memory['Rss']
+        total_pss += memory['Pss']
+        lines.append(f"{name:>10} {pid:>8} {memory['Rss'] / 1024:>9.1f} {memory['Pss'] / 1024:>9.1f} "
+                     f"{shared / 1024:>10.1f} {private / 1024:>11.1f}")
+    # Summed RSS counts shared pages once per process; summed PSS is the real footprint
+    lines.append(f"{'total':>10} {'':>8} {total_rss / 1024:>9.1f} {total_pss / 1024:>9.1f}")
+    return '\n'.join(lines)
+
+
+def listen(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(application, sock, host, port):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = make_server(host, port, application, threaded=True, fd=sock.fileno())
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def serve(application, host='0.0.0.0', port=5000, workers=4, report_interval=60):
+    """Fork workers onto one listening socket and keep them running until SIGTERM / SIGINT"""
+    sock = listen(host, port)
+    master_pid = os.getpid()
+    children = {}
+    stopping = []
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(application, sock, host, port)
+        children[pid] = slot
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(workers):
+        spawn(slot)
+    print(f'Serving on {host}:{port} with {workers} workers (master pid {master_pid})', flush=True)
+
+    next_report = time.monotonic() + min(5, report_interval) if report_interval else None
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in children:
+            slot = children.pop(pid)
+            print(f'Worker {pid} exited with status {status}; restarting', file=sys.stderr, flush=True)
+            spawn(slot)
+        if next_report is not None and time.monotonic() >= next_report:
+            print(memory_report(master_pid, sorted(children, key=children.get)), flush=True)
+            next_report = time.monotonic() + report_interval
+        time.sleep(0.5)
+
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+    for pid in list(children):
+        os.waitpid(pid, 0)
+    sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve app.py with pre-forked workers sharing one preloaded catalog')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument('--report-interval', type=float, default=60,
+                        help='Seconds between per-worker memory reports (0 disables them)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    application = preload()
+    print(f'Preloaded app in {time.perf_counter() - start:.2f}s; '
+          f'{gc.get_freeze_count():,} objects frozen', flush=True)
+    serve(application, host=args.host, port=args.port, workers=args.workers,
+          report_interval=args.report_interval)
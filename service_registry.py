@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class ServiceRegistry:
+    """Named services constructed on first use.
+
+    register() records a factory and hands back a LazyService stand-in, so
+    module-level names keep working while nothing is built at import time.
+    The first attribute access builds the service exactly once (factories
+    may get() the services they depend on) and records how long it took,
+    including its dependencies.
+    """
+
+    def __init__(self):
+        self.factories = {}
+        self.instances = {}
+        self.build_seconds = {}
+        self.lock = threading.RLock()
+
+    def register(self, name, factory):
+        self.factories[name] = factory
+        return LazyService(self, name)
+
+    def get(self, name):
+        instance = self.instances.get(name)
+        if instance is None:
+            with self.lock:
+                instance = self.instances.get(name)
+                if instance is None:
+                    start = time.perf_counter()
+                    instance = self.factories[name]()
+                    self.build_seconds[name] = time.perf_counter() - start
+                    self.instances[name] = instance
+        return instance
+
+    def built(self, name):
+        return name in self.instances
+
+    def build_all(self):
+        """Build every registered service (e.g. before forking workers)"""
+        for name in self.factories:
+            self.get(name)
+
+    def stats(self):
+        return {
+            'registered': list(self.factories),
+            'built_ms': {name: round(seconds * 1000, 2) for name, seconds in self.build_seconds.items()}
+        }
+
+
+class LazyService:
+    """Stand-in for a registered service: attribute access builds and forwards to it"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __repr__(self):
+        state = 'built' if self._registry.built(self._name) else 'not built'
+        return f'<LazyService {self._name} ({state})>'
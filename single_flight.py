@@ -0,0 +1,63 @@
+import threading
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one upstream request.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block on its result (or its exception) instead of starting
+    their own. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.counters = {'calls': 0, 'upstream_calls': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return (result, shared); shared is True when another caller's result was reused"""
+        with self.lock:
+            self.counters['calls'] += 1
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                call = self.calls[key] = InFlightCall()
+                self.counters['upstream_calls'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self.lock:
+                self.counters['errors'] += 1
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['in_flight'] = len(self.calls)
+        stats['saved_ratio'] = round(stats['coalesced'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
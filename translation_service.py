@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Thread-safe token bucket: at most rate calls per second, bursts up to burst"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TranslationService:
+    """Batched, deduplicating translation with a persistent segment cache.
+
+    Identical segments are translated once, (lang, text) pairs already in
+    the cache are served from it, and only the misses go upstream, in
+    parallel on a small thread pool under a shared rate limit. Results
+    come back in input order.
+    """
+
+    def __init__(self, translator_factory, cache, max_workers=8, rate_per_sec=5.0):
+        self.translator_factory = translator_factory
+        self.cache = cache
+        self.max_workers = max_workers
+        self.rate_limit = TokenBucket(rate_per_sec)
+        self.local = threading.local()
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def executor(self):
+        # Upstream calls always run on the pool so per-thread translators are reused
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='translate')
+            return self.pool
+
+    def translator(self):
+        # googletrans clients hold a connection pool, so keep one per thread
+        if not hasattr(self.local, 'translator'):
+            self.local.translator = self.translator_factory()
+        return self.local.translator
+
+    def cache_key(self, text, target_language):
+        return f'{target_language}:{text}'
+
+    def translate_uncached(self, text, target_language):
+        self.rate_limit.acquire()
+        translated = self.translator().translate(text, dest=target_language)
+        result = {'translated_text': translated.text, 'source_language': translated.src}
+        self.cache.set(self.cache_key(text, target_language), result)
+        return result
+
+    def translate(self, text, target_language):
+        """Translate one segment, using the cache when possible"""
+        cached = self.cache.get(self.cache_key(text, target_language))
+        if cached is not None:
+            return cached
+        return self.executor().submit(self.translate_uncached, text, target_language).result()
+
+    def translate_many(self, segments, target_language):
+        """Translate a list of segments; returns (results in input order, stats)"""
+        unique = list(dict.fromkeys(segments))
+        results = {}
+        misses = []
+        hits = 0
+        for text in unique:
+            if not text.strip():
+                results[text] = {'translated_text': text, 'source_language': None}
+                continue
+            cached = self.cache.get(self.cache_key(text, target_language))
+            if cached is not None:
+                results[text] = cached
+                hits += 1
+            else:
+                misses.append(text)
+
+        pool = self.executor()
+        futures = {text: pool.submit(self.translate_uncached, text, target_language) for text in misses}
+        for text, future in futures.items():
+            try:
+                results[text] = future.result()
+            except Exception as e:
+                results[text] = {'translated_text': None, 'source_language': None, 'error': str(e)}
+
+        translations = [dict(results[text], original_text=text) for text in segments]
+        stats = {
+            'segments': len(segments),
+            'unique': len(unique),
+            'cache_hits': hits,
+            'translated': len(misses),
+        }
+        return translations, stats
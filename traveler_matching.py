@@ -0,0 +1,244 @@
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+from gazetteer import normalize_place
+
+# Mersenne prime for the (a * x + b) mod p universal hash family
+MINHASH_PRIME = (1 << 61) - 1
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def parse_day(value):
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def trip_months(start, end):
+    """Calendar months (yyyy-mm) a trip touches"""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month) and len(months) < 12:
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def profile_tokens(profile):
+    """Sparse feature set for a profile: interests, travel style, destination and trip months"""
+    tokens = {f"i:{normalize_place(interest)}" for interest in profile.get('interests') or []}
+    tokens.discard('i:')
+    if profile.get('travel_style'):
+        tokens.add(f"s:{normalize_place(profile['travel_style'])}")
+    destination = normalize_place(profile.get('destination') or '')
+    if destination:
+        tokens.add(f"d:{destination}")
+        start, end = parse_day(profile.get('start_date')), parse_day(profile.get('end_date'))
+        if start and end:
+            # Travelers in the same place in the same month collide in more bands
+            tokens.update(f"m:{destination}:{month}" for month in trip_months(start, end))
+    return tokens
+
+
+def token_hashes(tokens):
+    # Stable across processes, unlike hash()
+    return np.array([int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), 'little')
+                     for t in sorted(tokens)], dtype=np.uint64)
+
+
+class MinHasher:
+    """MinHash signatures: num_perm 32-bit minimums of universal hashes over a token set"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        # a, b < 2**29 keep a * x + b below 2**61 for 32-bit x, so uint64 math never overflows
+        self.a = rng.integers(1, 1 << 29, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 29, num_perm, dtype=np.uint64)
+
+    def signature(self, tokens):
+        hashes = token_hashes(tokens)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        values = (np.outer(hashes, self.a) + self.b) % np.uint64(MINHASH_PRIME) & MAX_HASH
+        return values.min(axis=0).astype(np.uint32)
+
+
+def date_overlap_days(start, end, other_start, other_end):
+    if None in (start, end, other_start, other_end):
+        return 0
+    return max(0, (min(end, other_end) - max(start, other_start)).days + 1)
+
+
+class TravelerIndex:
+    """Traveler matching: MinHash/LSH candidate generation plus exact re-ranking.
+
+    Each profile's interests, travel style and destination become a token
+    set and a MinHash signature split into bands; profiles sharing any band
+    land in the same LSH bucket. A match request only looks at its own
+    buckets (capped at max_candidates), so its cost depends on how many
+    similar travelers there are, not on the total user count. Candidates
+    are re-ranked by exact interest Jaccard, style and destination match
+    and the overlap of their trip dates.
+    """
+
+    WEIGHTS = {'interests': 0.5, 'travel_style': 0.1, 'destination': 0.15, 'dates': 0.25}
+    # The only stored profile fields a match shows other travelers (no contact details or exact dates)
+    PUBLIC_FIELDS = ('user_id', 'name', 'age', 'interests', 'travel_style', 'safety_verified', 'mutual_connections')
+
+    def __init__(self, bands=16, rows=4, max_candidates=1000):
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        self.hasher = MinHasher(bands * rows)
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.profiles = []
+        self.interests = []
+        self.trips = []
+        self.band_keys = []
+        self.slots = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def band_keys_for(self, tokens):
+        signature = self.hasher.signature(tokens)
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def trip(self, profile):
+        return (normalize_place(profile.get('destination') or ''),
+                parse_day(profile.get('start_date')), parse_day(profile.get('end_date')),
+                normalize_place(profile.get('travel_style') or ''))
+
+    def indexed(self, profile):
+        """True if exactly this profile is already indexed for its user_id"""
+        with self.lock:
+            slot = self.slots.get(profile.get('user_id'))
+            return slot is not None and self.profiles[slot] == profile
+
+    def add(self, profile):
+        """Index a profile; re-adding a user_id updates its slot in place"""
+        with self.lock:
+            slot = self.slots.get(profile['user_id'])
+            if slot is not None and self.profiles[slot] == profile:
+                return slot
+        tokens = profile_tokens(profile)
+        keys = self.band_keys_for(tokens)
+        interests = {token for token in tokens if token.startswith('i:')}
+        with self.lock:
+            slot = self.slots.get(profile['user_id'])
+            if slot is None:
+                slot = len(self.profiles)
+                self.profiles.append(profile)
+                self.interests.append(interests)
+                self.trips.append(self.trip(profile))
+                self.band_keys.append(keys)
+                self.slots[profile['user_id']] = slot
+                for band, key in enumerate(keys):
+                    self.buckets[band][key].append(slot)
+                return slot
+            # Only the bands whose key changed move to another bucket
+            for band, (old_key, key) in enumerate(zip(self.band_keys[slot], keys)):
+                if old_key != key:
+                    self.unbucket(band, old_key, slot)
+                    self.buckets[band][key].append(slot)
+            self.profiles[slot] = profile
+            self.interests[slot] = interests
+            self.trips[slot] = self.trip(profile)
+            self.band_keys[slot] = keys
+        return slot
+
+    def remove(self, user_id):
+        with self.lock:
+            self.remove_locked(user_id)
+
+    def remove_locked(self, user_id):
+        slot = self.slots.pop(user_id, None)
+        if slot is None:
+            return
+        for band, key in enumerate(self.band_keys[slot]):
+            self.unbucket(band, key, slot)
+        # The slot stays allocated as a tombstone so other slot numbers keep their meaning
+        self.profiles[slot] = None
+
+    def unbucket(self, band, key, slot):
+        bucket = self.buckets[band][key]
+        bucket.remove(slot)
+        if not bucket:
+            del self.buckets[band][key]
+
+    def candidates(self, keys):
+        if len(self.slots) <= self.max_candidates:
+            # Small enough to re-rank everyone exactly
+            return list(self.slots.values())
+        seen = {}
+        for band, key in enumerate(keys):
+            # Only the newest max_candidates entries of a crowded bucket are considered
+            for slot in self.buckets[band].get(key, ())[-self.max_candidates:]:
+                seen[slot] = seen.get(slot, 0) + 1
+        # Slots sharing more bands are likelier to be similar, so keep those under the cap
+        return sorted(seen, key=seen.get, reverse=True)[:self.max_candidates]
+
+    def score(self, interests, trip, slot):
+        other_interests = self.interests[slot]
+        union = len(interests | other_interests)
+        jaccard = len(interests & other_interests) / union if union else 0.0
+
+        destination, start, end, style = trip
+        other_destination, other_start, other_end, other_style = self.trips[slot]
+        same_destination = bool(destination) and destination == other_destination
+        # Overlapping dates only matter when both travelers are going to the same place
+        overlap = date_overlap_days(start, end, other_start, other_end) if same_destination else 0
+        shortest = min((end - start).days + 1, (other_end - other_start).days + 1) if overlap else 1
+
+        weights = self.WEIGHTS
+        score = (weights['interests'] * jaccard
+                 + weights['travel_style'] * (bool(style) and style == other_style)
+                 + weights['destination'] * same_destination
+                 + weights['dates'] * overlap / shortest)
+        return score, jaccard, overlap
+
+    def match(self, profile, k=10):
+        """Return the k best matches for profile: public fields plus the score breakdown"""
+        tokens = profile_tokens(profile)
+        keys = self.band_keys_for(tokens)
+        interests = {token for token in tokens if token.startswith('i:')}
+        trip = self.trip(profile)
+
+        with self.lock:
+            scored = []
+            for slot in self.candidates(keys):
+                other = self.profiles[slot]
+                if other is None or other['user_id'] == profile.get('user_id'):
+                    continue
+                score, jaccard, overlap = self.score(interests, trip, slot)
+                if score > 0:
+                    scored.append((score, slot, other, jaccard, overlap))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        matches = []
+        for score, slot, other, jaccard, overlap in scored[:k]:
+            matches.append(dict(
+                {field: other[field] for field in self.PUBLIC_FIELDS if field in other},
+                match_score=round(score, 4),
+                interest_similarity=round(jaccard, 4),
+                shared_interests=sorted(set(other.get('interests') or []) & set(profile.get('interests') or [])),
+                date_overlap_days=overlap
+            ))
+        return matches
+
+    def stats(self):
+        with self.lock:
+            return {
+                'profiles': len(self.slots),
+                'buckets': sum(len(buckets) for buckets in self.buckets),
+                'bands': self.bands,
+                'rows': self.rows
+            }